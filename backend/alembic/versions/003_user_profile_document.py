@@ -0,0 +1,25 @@
+"""user profile document
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Precomputed /user/profile payload; populate with
+    # `python -m app.cli.backfill_profiles` after upgrading
+    op.add_column('users', sa.Column('profile_document', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'profile_document')
@@ -0,0 +1,30 @@
+"""refresh token selector/verifier
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # New tokens are '<row id>.<verifier>' and store a 32-byte keyed hash of
+    # the verifier; rows issued before this keep token_hash and stay valid
+    # until they expire (JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+    op.add_column('refresh_tokens', sa.Column('verifier_hash', sa.LargeBinary(length=32), nullable=True))
+    op.alter_column('refresh_tokens', 'token_hash', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    # Selector/verifier tokens cannot be looked up by hash; drop them
+    op.execute("DELETE FROM refresh_tokens WHERE token_hash IS NULL")
+    op.alter_column('refresh_tokens', 'token_hash', existing_type=sa.String(), nullable=False)
+    op.drop_column('refresh_tokens', 'verifier_hash')
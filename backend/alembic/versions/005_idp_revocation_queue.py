@@ -0,0 +1,50 @@
+"""idp revocation queue
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Encrypted upstream refresh tokens, revoked at the IdP on logout/unlink
+    op.add_column('refresh_tokens', sa.Column('upstream_provider', sa.String(), nullable=True))
+    op.add_column('refresh_tokens', sa.Column('upstream_refresh_token', sa.String(), nullable=True))
+    op.add_column('linked_identities', sa.Column('upstream_refresh_token', sa.String(), nullable=True))
+
+    # Durable queue drained by the background revocation workers
+    op.create_table(
+        'idp_revocations',
+        sa.Column('id', UUID(as_uuid=True), primary_key=True),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('token', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        'ix_idp_revocations_pending',
+        'idp_revocations',
+        ['next_attempt_at'],
+        postgresql_where=sa.text('failed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idp_revocations_pending', table_name='idp_revocations')
+    op.drop_table('idp_revocations')
+    op.drop_column('linked_identities', 'upstream_refresh_token')
+    op.drop_column('refresh_tokens', 'upstream_refresh_token')
+    op.drop_column('refresh_tokens', 'upstream_provider')
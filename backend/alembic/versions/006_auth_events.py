@@ -0,0 +1,50 @@
+"""auth event log
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+"""
+from datetime import date
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created up front; the event log worker keeps creating
+# upcoming ones (AuthEventLog.ensure_partitions)
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE auth_events (
+            id uuid NOT NULL,
+            occurred_at timestamptz NOT NULL,
+            event_type varchar NOT NULL,
+            user_id uuid,
+            provider varchar,
+            success boolean NOT NULL DEFAULT true,
+            detail json,
+            PRIMARY KEY (id, occurred_at)
+        ) PARTITION BY RANGE (occurred_at)
+    """)
+    op.execute("CREATE INDEX ix_auth_events_user_occurred ON auth_events (user_id, occurred_at)")
+    # Catches rows outside every monthly partition instead of failing the batch
+    op.execute("CREATE TABLE auth_events_default PARTITION OF auth_events DEFAULT")
+
+    month = date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD + 1):
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        op.execute(
+            f"CREATE TABLE auth_events_{month:%Y_%m} PARTITION OF auth_events "
+            f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        )
+        month = following
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE auth_events")
@@ -0,0 +1,30 @@
+"""hourly auth stats rollup
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Counters merged in by every process with INSERT ... ON CONFLICT DO UPDATE
+    op.create_table(
+        'auth_stats_hourly',
+        sa.Column('bucket', sa.DateTime(timezone=True), primary_key=True),
+        sa.Column('metric', sa.String(), primary_key=True),
+        sa.Column('provider', sa.String(), primary_key=True, server_default=''),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('auth_stats_hourly')
@@ -0,0 +1,29 @@
+"""unique primary identity per user
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Sign-in looks users up by primary identity, and the bulk import relies on
+    # ON CONFLICT to skip existing ones. Fails if duplicates already exist:
+    # find them with GROUP BY primary_identity_provider, primary_identity_id
+    op.create_unique_constraint(
+        'uq_users_primary_identity',
+        'users',
+        ['primary_identity_provider', 'primary_identity_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_users_primary_identity', 'users', type_='unique')
@@ -0,0 +1,59 @@
+"""
+Backfill users.profile_document for existing users.
+
+Walks the users table in primary-key order, one batch per transaction, so it
+can be interrupted and re-run safely.
+
+    python -m app.cli.backfill_profiles [--batch-size 500] [--all]
+"""
+import argparse
+from sqlalchemy.orm import selectinload
+from app.database import SessionLocal
+from app.models.user import User
+from app.services.user_service import UserService
+
+
+def backfill(batch_size: int, rebuild_all: bool) -> int:
+    """Build and store profile documents, returning the number of users updated"""
+    user_service = UserService()
+    updated = 0
+    last_id = None
+
+    while True:
+        db = SessionLocal()
+        try:
+            query = db.query(User).options(selectinload(User.linked_identities))
+            if not rebuild_all:
+                query = query.filter(User.profile_document.is_(None))
+            if last_id is not None:
+                query = query.filter(User.id > last_id)
+            users = query.order_by(User.id).limit(batch_size).all()
+
+            if not users:
+                break
+
+            for user in users:
+                user_service.refresh_profile_document(user, db)
+
+            db.commit()
+            updated += len(users)
+            last_id = users[-1].id
+            print(f"Backfilled {updated} profiles (last id {last_id})")
+        finally:
+            db.close()
+
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill stored user profile documents")
+    parser.add_argument("--batch-size", type=int, default=500, help="users per transaction")
+    parser.add_argument("--all", action="store_true", help="rebuild every profile, not only missing ones")
+    args = parser.parse_args()
+
+    total = backfill(args.batch_size, args.all)
+    print(f"Done: {total} profiles backfilled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Bulk-import users and linked identities from a Cognito/Auth0 export.
+
+Streams a CSV or NDJSON file in constant memory, validates and normalizes
+emails like UserService.create_user, and loads each batch with Postgres COPY
+into temporary staging tables followed by set-based merges into users and
+linked_identities. Records whose email or primary identity already exists, or
+repeats one of an earlier record in the file, are skipped, linked identities
+included; new users' profile documents are built afterwards. Every batch is one transaction; a checkpoint file records
+how many input records are committed, so an interrupted run continues where it
+stopped with --resume.
+
+Each record has:
+    email, email_verified, primary_identity_provider, primary_identity_id,
+    created_at (optional, ISO 8601; without an offset it is UTC),
+    linked_identities (optional list of {provider, identity_id, email};
+                       a JSON-encoded string in CSV files)
+
+Ids are strings. A record with a field of the wrong type, an unparseable
+created_at or an incomplete linked identity is rejected (reported with its
+line number) instead of failing the batch.
+
+    python -m app.cli.import_users users.ndjson [--batch-size 5000] [--resume]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from app.cli.backfill_profiles import backfill
+from app.database import engine
+from app.utils.email import is_valid_email, normalize_email
+
+# Created and dropped inside each batch's transaction, so no session state is
+# left behind (safe behind a transaction-mode pooler)
+STAGING_DDL = """
+CREATE TEMP TABLE import_users (
+    email text NOT NULL,
+    email_verified boolean NOT NULL,
+    primary_identity_provider text NOT NULL,
+    primary_identity_id text NOT NULL,
+    created_at timestamptz
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_linked_identities (
+    primary_identity_provider text NOT NULL,
+    primary_identity_id text NOT NULL,
+    identity_provider text NOT NULL,
+    identity_id text NOT NULL,
+    provider_email text NOT NULL
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_inserted_users (
+    id uuid NOT NULL,
+    primary_identity_provider text NOT NULL,
+    primary_identity_id text NOT NULL
+) ON COMMIT DROP;
+"""
+
+# Staging holds no two records with the same email or primary identity
+# (run_import drops repeats), so each staged primary identity names exactly
+# one record. Users created by this batch are recorded, and identities are
+# only attached to them, by that primary identity: a record whose email or
+# primary identity already exists (either unique constraint) is skipped
+# whole, and never adds logins to the existing account
+MERGE_USERS = """
+WITH inserted AS (
+    INSERT INTO users (id, email, email_verified, primary_identity_provider,
+                       primary_identity_id, created_at, profile_version)
+    SELECT gen_random_uuid(), s.email, s.email_verified, s.primary_identity_provider,
+           s.primary_identity_id, COALESCE(s.created_at, now()), 1
+    FROM import_users s
+    ON CONFLICT DO NOTHING
+    RETURNING id, primary_identity_provider, primary_identity_id
+)
+INSERT INTO import_inserted_users (id, primary_identity_provider, primary_identity_id)
+SELECT id, primary_identity_provider, primary_identity_id FROM inserted
+"""
+
+MERGE_LINKED_IDENTITIES = """
+INSERT INTO linked_identities (id, user_id, identity_provider, identity_id,
+                               provider_email, linked_at)
+SELECT gen_random_uuid(), i.id, s.identity_provider, s.identity_id, s.provider_email, now()
+FROM import_linked_identities s
+JOIN import_inserted_users i
+  ON i.primary_identity_provider = s.primary_identity_provider
+ AND i.primary_identity_id = s.primary_identity_id
+WHERE NOT (s.identity_provider = s.primary_identity_provider
+           AND s.identity_id = s.primary_identity_id)
+ON CONFLICT ON CONSTRAINT uq_provider_identity DO NOTHING
+"""
+
+USER_COLUMNS = "email, email_verified, primary_identity_provider, primary_identity_id, created_at"
+IDENTITY_COLUMNS = "primary_identity_provider, primary_identity_id, identity_provider, identity_id, provider_email"
+
+
+def read_records(path: str, file_format: str) -> Iterator[Optional[Dict]]:
+    """Yield raw records one at a time (None for lines that are not valid JSON)"""
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "t", "yes", "y")
+
+
+def _text(value) -> str:
+    """Stripped string field; anything else is treated as missing"""
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _parse_created_at(value) -> Tuple[Optional[str], Optional[str]]:
+    """(ISO 8601 timestamp in UTC for COPY, rejection reason)"""
+    if value is None or value == "":
+        return None, None
+    if not isinstance(value, str):
+        return None, f"created_at is not a string: {value!r}"
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None, f"invalid created_at {value!r}"
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(), None
+
+
+def normalize_record(record: Optional[Dict]) -> Tuple[Optional[Tuple], List[Tuple], Optional[str]]:
+    """Turn a raw record into (user row, identity rows, rejection reason)"""
+    if not isinstance(record, dict):
+        return None, [], "not a JSON object"
+
+    linked = record.get("linked_identities") or []
+    if isinstance(linked, str):
+        # CSV exports carry linked identities as a JSON-encoded column
+        try:
+            linked = json.loads(linked)
+        except ValueError:
+            return None, [], "linked_identities is not valid JSON"
+    if not isinstance(linked, list):
+        return None, [], "linked_identities is not a list"
+
+    email = normalize_email(_text(record.get("email")))
+    if not is_valid_email(email):
+        return None, [], f"invalid email {record.get('email')!r}"
+
+    provider = _text(record.get("primary_identity_provider"))
+    identity_id = _text(record.get("primary_identity_id"))
+    if not provider or not identity_id:
+        return None, [], "missing primary identity (ids must be strings)"
+
+    created_at, error = _parse_created_at(record.get("created_at"))
+    if error:
+        return None, [], error
+
+    user_row = (
+        email,
+        _parse_bool(record.get("email_verified", False)),
+        provider,
+        identity_id,
+        created_at
+    )
+
+    identity_rows = []
+    for number, identity in enumerate(linked, start=1):
+        if not isinstance(identity, dict):
+            return None, [], f"linked identity {number} is not an object"
+        identity_provider = _text(identity.get("provider"))
+        linked_id = _text(identity.get("identity_id"))
+        if not identity_provider or not linked_id:
+            return None, [], f"linked identity {number}: missing provider or identity_id (must be strings)"
+        provider_email = normalize_email(_text(identity.get("email")) or email)
+        if not is_valid_email(provider_email):
+            return None, [], f"linked identity {number}: invalid email {identity.get('email')!r}"
+        identity_rows.append((provider, identity_id, identity_provider, linked_id, provider_email))
+
+    return user_row, identity_rows, None
+
+
+def _to_csv(rows: List[Tuple]) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # Empty unquoted fields are NULL in COPY's CSV format
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    return buffer
+
+
+def _copy(cursor, table: str, columns: str, rows: List[Tuple]) -> None:
+    sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    buffer = _to_csv(rows)
+    if hasattr(cursor, "copy_expert"):
+        # psycopg2
+        cursor.copy_expert(sql, buffer)
+    else:
+        # psycopg 3
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def load_batch(connection, users: List[Tuple], identities: List[Tuple]) -> Tuple[int, int]:
+    """COPY one batch into staging and merge it, returning (users, identities) inserted"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(STAGING_DDL)
+        _copy(cursor, "import_users", USER_COLUMNS, users)
+        _copy(cursor, "import_linked_identities", IDENTITY_COLUMNS, identities)
+        cursor.execute(MERGE_USERS)
+        inserted_users = cursor.rowcount
+        cursor.execute(MERGE_LINKED_IDENTITIES)
+        inserted_identities = cursor.rowcount
+        connection.commit()
+        return inserted_users, inserted_identities
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _read_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return json.load(checkpoint)["records"]
+
+
+def _write_checkpoint(path: str, records: int) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as checkpoint:
+        json.dump({"records": records}, checkpoint)
+    os.replace(temporary, path)
+
+
+def run_import(path: str, file_format: str, batch_size: int, checkpoint_path: str, resume: bool) -> Dict:
+    """Import a file batch by batch, returning totals"""
+    skip = _read_checkpoint(checkpoint_path) if resume else 0
+    totals = {"records": skip, "users": 0, "identities": 0, "skipped": 0, "rejected": 0}
+    started = time.monotonic()
+
+    connection = engine.raw_connection()
+    try:
+        users: List[Tuple] = []
+        identities: List[Tuple] = []
+        # Emails and primary identities staged in this batch; earlier batches'
+        # are caught by the users table's unique constraints
+        batch_emails: Set[str] = set()
+        batch_identities: Set[Tuple[str, str]] = set()
+        position = 0
+
+        def flush() -> None:
+            inserted_users, inserted_identities = load_batch(connection, users, identities)
+            totals["records"] = position
+            totals["users"] += inserted_users
+            totals["identities"] += inserted_identities
+            totals["skipped"] += len(users) - inserted_users
+            _write_checkpoint(checkpoint_path, position)
+            rate = (position - skip) / max(time.monotonic() - started, 1e-9)
+            print(
+                f"{position} records, {totals['users']} users, {totals['identities']} identities, "
+                f"{totals['skipped']} skipped, {totals['rejected']} rejected ({rate:.0f} records/s)",
+                file=sys.stderr
+            )
+            users.clear()
+            identities.clear()
+            batch_emails.clear()
+            batch_identities.clear()
+
+        for position, record in enumerate(read_records(path, file_format), start=1):
+            if position <= skip:
+                continue
+
+            user_row, identity_rows, error = normalize_record(record)
+            if error:
+                totals["rejected"] += 1
+                print(f"record {position}: {error}", file=sys.stderr)
+            elif user_row[0] in batch_emails or user_row[2:4] in batch_identities:
+                totals["skipped"] += 1
+                print(f"record {position}: repeats the email or primary identity of an earlier record", file=sys.stderr)
+            else:
+                batch_emails.add(user_row[0])
+                batch_identities.add(user_row[2:4])
+                users.append(user_row)
+                identities.extend(identity_rows)
+
+            if len(users) >= batch_size:
+                flush()
+
+        if users or position > totals["records"]:
+            flush()
+    finally:
+        connection.close()
+
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-import users from a CSV or NDJSON export")
+    parser.add_argument("path", help="export file (.csv or .ndjson/.jsonl)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000, help="users per COPY/merge transaction")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="skip records committed by a previous run")
+    parser.add_argument("--skip-backfill", action="store_true", help="do not build profile documents afterwards")
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint"
+
+    totals = run_import(args.path, file_format, args.batch_size, checkpoint_path, args.resume)
+    print(
+        f"Imported {totals['users']} users and {totals['identities']} linked identities "
+        f"from {totals['records']} records ({totals['skipped']} skipped, {totals['rejected']} rejected)"
+    )
+
+    if not args.skip_backfill:
+        backfill(batch_size=500, rebuild_all=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Replay captured traffic against a local instance and compare it with a baseline.
+
+Reads a TRAFFIC_CAPTURE_FILE recording and re-drives its request mix, in order,
+against the application running in this process on a temporary SQLite
+database, with every identity provider replaced by an in-memory stand-in.
+Placeholders are filled with fresh credentials for synthetic users (one per
+pseudonymous user in the capture), created outside the measured requests. The
+replayed requests are measured by the capture middleware itself: server time
+and SQL statement count per request, summarized per route.
+
+    python -m app.cli.replay_traffic capture.ndjson [--repeat 3] [--save-baseline baseline.json]
+    python -m app.cli.replay_traffic capture.ndjson --baseline baseline.json
+
+The exit status is 1 when a route executed more statements than its
+ROUTE_QUERY_BUDGETS entry (app.utils.sql_profiler) in any request. With
+--baseline it is also 1 when a route's p95 latency grew by more than
+--max-latency-regression (and --min-latency-delta-ms), or its mean
+statement count grew at all. Latency is only comparable between runs on the
+same machine; statement counts are deterministic.
+"""
+import os
+import tempfile
+
+# The replayed instance is configured before the application settings load.
+# Its database is a SQLite file so background workers get their own connections
+REPLAY_DIRECTORY = tempfile.mkdtemp(prefix="replay-")
+REPLAY_OUTPUT = os.path.join(REPLAY_DIRECTORY, "replay.ndjson")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(REPLAY_DIRECTORY, 'replay.db')}",
+    "TRAFFIC_CAPTURE_FILE": REPLAY_OUTPUT,
+    "TRAFFIC_CAPTURE_SAMPLE_RATE": "1",
+    "TRAFFIC_CAPTURE_MAX_REQUESTS": str(2 ** 31),
+    # Keep background flushes out of the measured requests
+    "AUTH_EVENT_FLUSH_SECONDS": "3600",
+    "AUTH_STATS_FLUSH_SECONDS": "3600"
+})
+
+import argparse
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import orjson
+from fastapi.testclient import TestClient
+from app.database import SessionLocal
+from app.main import app
+from app.routers import auth, link
+from app.services import providers
+from app.services.jwt_service import JWTService
+from app.services.link_service import LinkService
+from app.services.oidc_service import OIDCProviderService
+from app.services.user_service import UserService
+from app.utils.http_cache import profile_etag
+from app.utils.security import generate_state_parameter, hash_token
+from app.utils.sql_profiler import ROUTE_QUERY_BUDGETS
+
+INVALID = "replay-invalid"
+# Routes that read the refresh cookie; elsewhere its value does not matter
+REFRESH_COOKIE_ROUTES = {"/api/v1/auth/refresh", "/api/v1/auth/logout"}
+
+
+class StandInProvider(OIDCProviderService):
+    """Identity provider answering from memory: the authorization code is the identity"""
+
+    async def discover(self, cache, now: float) -> bool:
+        return True
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def get_authorization_url(self, state: str) -> str:
+        return f"https://idp.replay.invalid/{self.name}/authorize?state={state}"
+
+    async def exchange_code_for_tokens(self, code: str) -> Optional[Dict]:
+        if code == INVALID:
+            return None
+        return {"id_token": code, "access_token": code, "refresh_token": f"upstream-{code}"}
+
+    async def verify_id_token(self, id_token: str) -> Optional[Dict]:
+        subject, _, email = id_token.partition("|")
+        return {"sub": subject, "email": email, "email_verified": True}
+
+    async def get_user_info(self, access_token: str) -> Optional[Dict]:
+        return await self.verify_id_token(access_token)
+
+    async def revoke_token(self, token: str) -> bool:
+        return True
+
+
+class Replayer:
+    """Turns captured records into requests for synthetic users"""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.user_service = UserService()
+        self.link_service = LinkService()
+        self.jwt_service = JWTService()
+        self._users: Dict[Tuple[int, int], Tuple[str, str]] = {}
+        self._primary_providers: Dict[Tuple[int, int], str] = {}
+        self._next_anonymous = 0
+
+    def _identity(self, key: Tuple[int, int], provider: str) -> Tuple[str, str]:
+        return f"replay-{key[0]}-{key[1]}-{provider}", f"replay-{key[0]}-{key[1]}@example.com"
+
+    def _user(self, key: Tuple[int, int]) -> Tuple[str, str]:
+        """(user id, email) of a synthetic user, created on first use"""
+        if key not in self._users:
+            provider = self._primary_providers.setdefault(key, "cognito")
+            subject, email = self._identity(key, provider)
+            db = SessionLocal()
+            try:
+                user = self.user_service.get_user_by_identity(provider, subject, db)
+                if user is None:
+                    user = self.user_service.create_user(email, provider, subject, True, db)
+                self._users[key] = (str(user.id), user.email)
+            finally:
+                db.close()
+        return self._users[key]
+
+    def _key(self, record: Dict, repetition: int) -> Tuple[int, int]:
+        if "u" in record:
+            return repetition, record["u"]
+        # Requests without an identifiable user each get their own
+        self._next_anonymous -= 1
+        return repetition, self._next_anonymous
+
+    def send(self, record: Dict, repetition: int):
+        route, path_params = record["r"], record["p"]
+        provider = path_params.get("provider", "cognito")
+        failed = record["s"] >= 400
+        key = self._key(record, repetition)
+
+        params = {name: value for name, value in record["q"].items() if not value.startswith("<")}
+        headers: Dict[str, str] = {}
+        cookies: Dict[str, str] = {}
+
+        if route == "/api/v1/auth/callback/{provider}":
+            params["state"], params["code"] = INVALID, INVALID
+            if not failed:
+                params["state"] = generate_state_parameter()
+                auth.state_storage[hash_token(params["state"])] = {"provider": provider}
+                provider = self._primary_providers.setdefault(key, provider)
+                if "signup" not in record["e"]:
+                    self._user(key)
+                params["code"] = "|".join(self._identity(key, provider))
+        elif route == "/api/v1/link/callback/{provider}":
+            params["state"], params["code"] = INVALID, INVALID
+            if not failed:
+                user_id, email = self._user(key)
+                params["state"] = generate_state_parameter()
+                link.link_state_storage[hash_token(params["state"])] = {"provider": provider, "user_id": user_id}
+                params["code"] = f"{self._identity(key, provider)[0]}-linked|{email}"
+        elif route == "/api/v1/link/{provider}" and not failed:
+            user_id, email = self._user(key)
+            db = SessionLocal()
+            try:
+                linked = self.link_service.get_linked_identities(user_id, db)
+                if not any(identity.identity_provider == provider for identity in linked):
+                    subject = f"{self._identity(key, provider)[0]}-linked"
+                    self.link_service.link_identity(user_id, provider, subject, email, db)
+            finally:
+                db.close()
+
+        if "refresh" in record["a"] and route in REFRESH_COOKIE_ROUTES:
+            cookies["refresh_token"] = INVALID
+            if not failed:
+                db = SessionLocal()
+                try:
+                    cookies["refresh_token"] = self.jwt_service.create_refresh_token(self._user(key)[0], db)
+                finally:
+                    db.close()
+
+        if "bearer" in record["a"]:
+            headers["Authorization"] = f"Bearer {INVALID}"
+            if record["s"] != 401:
+                user_id, email = self._user(key)
+                headers["Authorization"] = f"Bearer {self.jwt_service.create_access_token(user_id, email)}"
+
+        if "etag" in record["a"]:
+            headers["If-None-Match"] = '"stale"'
+            if record["s"] == 304:
+                user_id, _ = self._user(key)
+                db = SessionLocal()
+                try:
+                    version = self.user_service.get_user_by_id(user_id, db, use_replica=False).profile_version
+                finally:
+                    db.close()
+                headers["If-None-Match"] = profile_etag(user_id, version)
+
+        # Only the cookies of this record, not those set by earlier responses
+        self.client.cookies = cookies
+        return self.client.request(record["m"], route.format(**path_params), params=params, headers=headers)
+
+
+def _load(path: str) -> List[Dict]:
+    with open(path, "rb") as source:
+        return [orjson.loads(line) for line in source if line.strip()]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(records: List[Dict]) -> Dict[str, Dict]:
+    """Latency percentiles and statement counts per method and route"""
+    by_route: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        by_route[f"{record['m']} {record['r']}"].append(record)
+
+    summary = {}
+    for route, group in sorted(by_route.items()):
+        latencies = [record["ms"] for record in group]
+        statements = [record["db"] for record in group]
+        summary[route] = {
+            "count": len(group),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "mean_queries": round(sum(statements) / len(statements), 3),
+            "max_queries": max(statements)
+        }
+    return summary
+
+
+def replay(captured: List[Dict], repeat: int) -> Tuple[List[Dict], int]:
+    """Replay the capture repeat times, returning the measured records and status mismatches"""
+    for provider_type in list(providers.PROVIDER_TYPES):
+        providers.PROVIDER_TYPES[provider_type] = StandInProvider
+
+    mismatches = 0
+    with TestClient(app) as client:
+        replayer = Replayer(client)
+        for repetition in range(repeat):
+            for record in captured:
+                response = replayer.send(record, repetition)
+                if response.status_code != record["s"]:
+                    mismatches += 1
+
+    return _load(REPLAY_OUTPUT), mismatches
+
+
+def compare(summary: Dict, baseline: Dict, max_regression: float, min_delta_ms: float) -> List[str]:
+    """Print the comparison table and return the routes that regressed"""
+    regressions = []
+    print(f"{'route':<48} {'n':>6} {'p50':>8} {'p95':>8} {'base p95':>9} {'queries':>8} {'base q':>7}")
+    for route, current in summary.items():
+        base = baseline.get(route)
+        base_p95 = f"{base['p95_ms']:.2f}" if base else "-"
+        base_queries = f"{base['mean_queries']:.2f}" if base else "-"
+        flag = ""
+        if current["max_queries"] > ROUTE_QUERY_BUDGETS.get(route, current["max_queries"]):
+            flag += " BUDGET"
+        if base:
+            slower = current["p95_ms"] > base["p95_ms"] * (1 + max_regression)
+            if slower and current["p95_ms"] - base["p95_ms"] >= min_delta_ms:
+                flag += " LATENCY"
+            if current["mean_queries"] > base["mean_queries"]:
+                flag += " QUERIES"
+        if flag:
+            regressions.append(route)
+        print(
+            f"{route:<48} {current['count']:>6} {current['p50_ms']:>8.2f} {current['p95_ms']:>8.2f} "
+            f"{base_p95:>9} {current['mean_queries']:>8.2f} {base_queries:>7}{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare with a baseline")
+    parser.add_argument("capture", help="TRAFFIC_CAPTURE_FILE recording")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the mix this many times")
+    parser.add_argument("--baseline", help="summary saved by an earlier --save-baseline run")
+    parser.add_argument("--save-baseline", help="write this run's summary here")
+    parser.add_argument("--max-latency-regression", type=float, default=0.25, help="allowed p95 growth (fraction)")
+    parser.add_argument("--min-latency-delta-ms", type=float, default=0.5, help="ignore smaller p95 changes")
+    args = parser.parse_args()
+
+    captured = _load(args.capture)
+    if not captured:
+        print("Capture is empty", file=sys.stderr)
+        sys.exit(1)
+
+    measured, mismatches = replay(captured, args.repeat)
+    summary = summarize(measured)
+    print(f"Replayed {len(measured)} requests ({mismatches} with a different status than captured)", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "wb") as target:
+            target.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "rb") as source:
+            baseline = orjson.loads(source.read())
+
+    regressions = compare(summary, baseline, args.max_latency_regression, args.min_latency_delta_ms)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
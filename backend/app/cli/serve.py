@@ -0,0 +1,103 @@
+"""
+Production server entry point.
+
+Starts N uvicorn worker processes and sizes each worker's database pool from
+one global connection budget, so scaling workers never exceeds Postgres
+max_connections:
+
+    python -m app.cli.serve --workers 4 --db-max-connections 100
+
+Every option can also be set through the environment (WEB_CONCURRENCY,
+DB_MAX_CONNECTIONS, ...). On SIGTERM uvicorn stops accepting connections and
+waits up to --graceful-timeout seconds for in-flight requests (e.g. OAuth
+callbacks) before the lifespan shutdown closes pools and clients.
+"""
+import argparse
+import os
+import sys
+from typing import Tuple
+import uvicorn
+
+# Share of each worker's connections kept open in the pool; the rest is overflow
+POOL_SHARE = 0.6
+
+
+def plan_db_pool(max_connections: int, workers: int, reserved: int) -> Tuple[int, int]:
+    """Split a global connection budget into per-worker (pool_size, max_overflow)"""
+    per_worker = (max_connections - reserved) // workers
+    if per_worker < 1:
+        raise ValueError(
+            f"DB connection budget {max_connections} (minus {reserved} reserved) "
+            f"cannot give each of {workers} workers a connection"
+        )
+
+    pool_size = max(1, round(per_worker * POOL_SHARE))
+    return pool_size, per_worker - pool_size
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("PORT", 8000))
+    parser.add_argument(
+        "--workers", type=int, default=_env_int("WEB_CONCURRENCY", os.cpu_count() or 1),
+        help="worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--db-max-connections", type=int, default=_env_int("DB_MAX_CONNECTIONS", 0),
+        help="global connection budget shared by all workers (0 keeps DB_POOL_SIZE/DB_MAX_OVERFLOW)"
+    )
+    parser.add_argument(
+        "--db-reserved-connections", type=int, default=_env_int("DB_RESERVED_CONNECTIONS", 5),
+        help="connections left free for migrations, CLIs and admin sessions"
+    )
+    parser.add_argument(
+        "--keep-alive", type=int, default=_env_int("KEEP_ALIVE_SECONDS", 75),
+        help="idle keep-alive; keep above the load balancer's idle timeout"
+    )
+    parser.add_argument("--backlog", type=int, default=_env_int("BACKLOG", 2048))
+    parser.add_argument("--graceful-timeout", type=int, default=_env_int("GRACEFUL_TIMEOUT_SECONDS", 30))
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.db_max_connections:
+        try:
+            pool_size, max_overflow = plan_db_pool(
+                args.db_max_connections, args.workers, args.db_reserved_connections
+            )
+        except ValueError as e:
+            parser.error(str(e))
+
+        # Workers read their pool sizing from the environment they inherit
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+        min_size = _env_int("DB_POOL_MIN_SIZE", 2)
+        os.environ["DB_POOL_MIN_SIZE"] = str(min(min_size, pool_size))
+
+        print(
+            f"{args.workers} workers x (pool {pool_size} + overflow {max_overflow}) "
+            f"within a budget of {args.db_max_connections} connections",
+            file=sys.stderr
+        )
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True
+    )
+
+
+if __name__ == "__main__":
+    main()
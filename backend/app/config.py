@@ -11,12 +11,96 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5  # per process; app.cli.serve derives it from a global budget
+    DB_MAX_OVERFLOW: int = 10
+    DB_PREPARE_THRESHOLD: int = 2  # server-side prepare after N runs (postgresql+psycopg URLs only)
+    DB_POOL_MIN_SIZE: int = 2  # connections opened at startup, before reporting ready
+    # "transaction" behind PgBouncer/pgcat transaction pooling: no prepared
+    # statements and no per-checkout pre-ping (liveness via recycle + background check)
+    DB_POOLER_MODE: str = "none"
+    DB_POOL_PRE_PING: bool = True  # ping on every checkout (always off in transaction mode)
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # replace pooled connections older than this (-1 never)
+    DB_HEALTH_CHECK_SECONDS: float = 15.0  # background primary check when pre-ping is off
+
+    # Read replicas (comma-separated URLs; empty sends every query to the primary)
+    DATABASE_REPLICA_URLS: str = ""
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # reads stay on the primary after a client's own writes
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 10.0
 
     # JWT Configuration
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Rotate a refresh token only once it is older than this fraction of its
+    # lifetime (0 rotates on every refresh, 0.5 after half of the lifetime)
+    JWT_REFRESH_ROTATION_THRESHOLD: float = 0.0
+    # Key for hashing refresh token verifiers (defaults to JWT_SECRET_KEY)
+    REFRESH_TOKEN_HMAC_KEY: Optional[str] = None
+    # In-memory filter of live refresh tokens: unknown tokens are rejected without a query.
+    # Enable only once no process issues UUIDv4 selectors (see README)
+    REFRESH_TOKEN_FILTER: bool = False
+    REFRESH_TOKEN_FILTER_REBUILD_SECONDS: float = 300.0  # drops revoked/expired tokens, adds newer ones
+    REFRESH_TOKEN_FILTER_FALSE_POSITIVE_RATE: float = 0.01  # unknown tokens that still reach the database
+
+    # Profiles
+    PROFILE_CACHE_SIZE: int = 10000  # in-memory profile documents per process (0 disables)
+
+    # Identity provider HTTP clients
+    IDP_HTTP_TIMEOUT_SECONDS: float = 5.0  # read/write/pool timeout per attempt
+    IDP_HTTP_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    IDP_HTTP_MAX_CONNECTIONS: int = 20
+    IDP_RETRY_ATTEMPTS: int = 2  # extra attempts for idempotent calls (JWKS, userinfo, revoke)
+    IDP_RETRY_BACKOFF_SECONDS: float = 0.1  # base of the jittered exponential backoff
+    IDP_HEDGE_DELAY_SECONDS: float = 0.0  # send a second idempotent request after this long (0 disables)
+    IDP_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures that open an endpoint's breaker
+    IDP_BREAKER_RESET_SECONDS: float = 30.0  # fail fast this long before a trial call
+
+    # Admin API (disabled unless a key is set; sent as the X-Admin-Key header)
+    ADMIN_API_KEY: Optional[str] = None
+    EXPORT_BATCH_SIZE: int = 1000  # users per keyset page in exports
+
+    # Upstream (IdP) token revocation on logout/unlink
+    IDP_TOKEN_ENCRYPTION_KEY: Optional[str] = None  # encrypts stored IdP refresh tokens (defaults to JWT_SECRET_KEY)
+    IDP_REVOCATION_WORKERS: int = 4  # concurrent revocation requests per process
+    IDP_REVOCATION_POLL_SECONDS: float = 5.0
+    IDP_REVOCATION_MAX_ATTEMPTS: int = 8  # then the item is parked with failed_at set
+    IDP_REVOCATION_BACKOFF_SECONDS: float = 5.0  # base of the jittered exponential backoff
+    IDP_REVOCATION_MAX_BACKOFF_SECONDS: float = 3600.0
+
+    # Authentication event log
+    AUTH_EVENT_BUFFER_SIZE: int = 10000  # events held in memory; new events are dropped beyond this
+    AUTH_EVENT_BATCH_SIZE: int = 500  # events per INSERT
+    AUTH_EVENT_FLUSH_SECONDS: float = 1.0
+    AUTH_STATS_FLUSH_SECONDS: float = 10.0  # merge in-process counters into hourly rollups
+
+    # Readiness probes (run in the background; /health/ready only reads their results)
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 10.0
+    HEALTH_PROBE_TTL_SECONDS: float = 30.0  # older results make the process not ready
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 3.0  # per check (database ping, IdP discovery)
+
+    # Traffic capture for app.cli.replay_traffic (off unless a file is set)
+    TRAFFIC_CAPTURE_FILE: Optional[str] = None  # NDJSON of sanitized auth/link/user requests
+    TRAFFIC_CAPTURE_SAMPLE_RATE: float = 1.0  # fraction of requests recorded
+    TRAFFIC_CAPTURE_MAX_REQUESTS: int = 100000  # per process; later requests are not recorded
+
+    # Event loop diagnostics
+    EVENT_LOOP_MONITOR: bool = True  # lag sampler, blocking watchdog and per-route attribution
+    EVENT_LOOP_SAMPLE_SECONDS: float = 0.05
+    EVENT_LOOP_BLOCK_THRESHOLD_MS: float = 100.0  # a callback blocking longer is captured with its stack
+    EVENT_LOOP_STRICT: bool = False  # raise EventLoopBlockedError from requests that block (tests)
+
+    # SQL instrumentation
+    SQL_PROFILER: bool = True  # per-route statement counts and time, slow-query log, N+1 detection
+    SQL_SLOW_QUERY_MS: float = 100.0
+    SQL_N_PLUS_ONE_THRESHOLD: int = 3  # same statement fingerprint this many times in one request
+    SQL_STRICT: bool = False  # raise QueryBudgetExceeded from routes over budget (tests)
+
+    # Identity provider registry
+    PROVIDER_TENANTS_FILE: Optional[str] = None  # JSON list of extra provider tenants
+    PROVIDER_CLIENT_CACHE_SIZE: int = 100  # live provider clients (HTTP pool + keys) per process
+    PROVIDER_CLIENT_IDLE_SECONDS: float = 300.0  # close a provider client unused this long
+    OIDC_DISCOVERY_TTL_SECONDS: float = 3600.0
 
     # AWS Cognito
     AWS_REGION: str = "us-east-1"
@@ -35,6 +119,16 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
 
+    @property
+    def db_transaction_pooling(self) -> bool:
+        """Whether connections go through a transaction-mode pooler"""
+        return self.DB_POOLER_MODE == "transaction"
+
+    @property
+    def db_pool_pre_ping(self) -> bool:
+        """Whether pooled connections are pinged on checkout"""
+        return self.DB_POOL_PRE_PING and not self.db_transaction_pooling
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,23 +1,211 @@
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, TypeVar
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.config import settings
 
+T = TypeVar("T")
+
+
+def is_memory_database(url: str) -> bool:
+    """True for in-memory SQLite URLs (sqlite://, sqlite:///:memory:)"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _create_engine(url: str) -> Engine:
+    if make_url(url).get_backend_name() == "sqlite":
+        # Tests and benchmarks: threadpool routes share the connection, and an
+        # in-memory database lives exactly as long as its single connection
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool if is_memory_database(url) else None
+        )
+
+    transaction_pooling = settings.db_transaction_pooling
+
+    connect_args = {}
+    if make_url(url).get_driver_name() == "psycopg":
+        # psycopg 3 prepares a statement server-side once it has run this many
+        # times on a connection (psycopg2 has no server-side prepare). Behind a
+        # transaction pooler the next transaction may run on another server
+        # connection, so prepared statements are disabled (None)
+        connect_args["prepare_threshold"] = None if transaction_pooling else settings.DB_PREPARE_THRESHOLD
+
+    return create_engine(
+        url,
+        # Pre-ping costs a round trip per checkout (i.e. per request); without
+        # it, stale connections are replaced by recycle and the background check
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        connect_args=connect_args
+    )
+
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=5,
-    max_overflow=10
-)
+engine = _create_engine(settings.DATABASE_URL)
+
+
+class ReplicaSet:
+    """Read replica engines with health tracking and round-robin selection"""
+
+    def __init__(self, urls: List[str]):
+        self.engines = [_create_engine(url) for url in urls]
+        self._healthy = set(range(len(self.engines)))
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def pick(self) -> Optional[Engine]:
+        """Next healthy replica, or None to fall back to the primary"""
+        with self._lock:
+            healthy = sorted(self._healthy)
+        if not healthy:
+            return None
+        return self.engines[healthy[next(self._counter) % len(healthy)]]
+
+    def mark_unhealthy(self, replica: Engine) -> None:
+        """Take a replica out of rotation until the next successful check"""
+        with self._lock:
+            self._healthy.discard(self.engines.index(replica))
+
+    def check(self) -> Dict[str, bool]:
+        """Ping every replica and update the healthy set"""
+        status = {}
+        for index, replica in enumerate(self.engines):
+            try:
+                with replica.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                healthy = True
+            except DBAPIError:
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    self._healthy.add(index)
+                else:
+                    self._healthy.discard(index)
+            status[replica.url.render_as_string(hide_password=True)] = healthy
+        return status
+
+    def dispose(self) -> None:
+        for replica in self.engines:
+            replica.dispose()
+
+
+replicas = ReplicaSet([
+    url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+])
+
+# Read-your-writes state of the request being handled, set by
+# ReadYourWritesMiddleware from the client's cookie: {"wrote_at": Unix time
+# of the client's last write or None, "wrote": whether this request wrote}.
+# A mutable holder, so flushes in threadpool routes update the request's copy
+request_writes: ContextVar[Optional[Dict]] = ContextVar("request_writes", default=None)
+
+# Short-lived sessions for read_only(): the bind is the replica of each call
+ReplicaSession = sessionmaker(autocommit=False, autoflush=False)
+
+
+def _wrote_recently() -> bool:
+    state = request_writes.get()
+    if state is None:
+        return False
+    if state["wrote"]:
+        return True
+    # Worker clocks differ a little; a cookie dated far ahead is ignored
+    wrote_at = state["wrote_at"]
+    return wrote_at is not None and abs(time.time() - wrote_at) < settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+def read_only(db: Session, query: Callable[[Session], T]) -> T:
+    """
+    Run a read-only query, given the session to run it on, on a healthy replica.
+
+    The replica query gets a session of its own, closed (and its connection
+    released) when the query returns, so ORM objects come back detached with
+    the attributes the query loaded. Falls back to db, the primary, when no
+    replica is healthy, when the client wrote within
+    DB_READ_YOUR_WRITES_SECONDS, or when the replica fails; the failed
+    replica session is discarded and db's pending work is untouched.
+    """
+    replica = None if _wrote_recently() else replicas.pick()
+    if replica is None:
+        return query(db)
+
+    try:
+        with ReplicaSession(bind=replica) as replica_db:
+            return query(replica_db)
+    except DBAPIError:
+        replicas.mark_unhealthy(replica)
+        return query(db)
+
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_request_writes(session: Session, flush_context) -> None:
+    """Open the read-your-writes window for the client whose request wrote"""
+    state = request_writes.get()
+    if state is not None and (session.new or session.dirty or session.deleted):
+        state["wrote"] = True
+
+
 # Create Base class for models
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    """Current UTC time, used as the Python-side default for timestamp columns"""
+    return datetime.now(timezone.utc)
+
+
+def create_sqlite_schema() -> bool:
+    """Create missing tables when running on SQLite (migrations target Postgres)"""
+    if make_url(settings.DATABASE_URL).get_backend_name() != "sqlite":
+        return False
+
+    import app.models  # noqa: F401 - registers the tables on Base.metadata
+    Base.metadata.create_all(engine)
+    return True
+
+
+def warm_pool(min_size: int) -> None:
+    """Open min_size connections up front so first requests skip the connect"""
+    connections = []
+    try:
+        for bound_engine in [engine, *replicas.engines]:
+            for _ in range(min_size):
+                connections.append(bound_engine.connect())
+    finally:
+        # Closing returns them to the pool, still connected
+        for connection in connections:
+            connection.close()
+
+
+def check_primary() -> bool:
+    """Ping the primary; on failure drop pooled connections so requests reconnect"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except OperationalError:
+        engine.dispose()
+        return False
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
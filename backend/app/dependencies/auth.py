@@ -1,29 +1,28 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
+from app.models.user import User
 from app.services.jwt_service import JWTService
-from app.services.user_service import UserService
-from typing import Dict
+from app.services.user_service import Principal, UserService
+from typing import Optional
+import secrets
 
 security = HTTPBearer()
 jwt_service = JWTService()
 user_service = UserService()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Dict:
-    """Dependency to get current user from JWT token"""
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """Dependency verifying the bearer token and returning its subject, without a query"""
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated"
         )
 
-    token = credentials.credentials
-    payload = jwt_service.verify_access_token(token)
+    payload = jwt_service.verify_access_token(credentials.credentials)
 
     if not payload:
         raise HTTPException(
@@ -31,16 +30,57 @@ async def get_current_user(
             detail="Invalid or expired token"
         )
 
-    user_id = payload.get("sub")
-    user = user_service.get_user_by_id(user_id, db)
+    return payload.get("sub")
+
+
+def user_not_found() -> HTTPException:
+    """401 for a valid token whose user no longer exists"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found"
+    )
+
+
+async def get_current_user(
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Dependency resolving the bearer token to the caller's Principal.
+    A single Core query for id, email and profile_version; no ORM entity is
+    built. FastAPI caches it per request, so every dependency and route that
+    shares it sees the same row.
+    """
+    principal = user_service.get_principal(user_id, db)
+    if principal is None:
+        raise user_not_found()
+    return principal
+
 
+async def get_authenticated_user_with_identities(
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency loading the authenticated User entity with linked identities,
+    from the primary, for routes that modify it
+    """
+    user = user_service.get_user_by_id(user_id, db, load_identities=True, use_replica=False)
     if not user:
+        raise user_not_found()
+    return user
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Dependency guarding admin endpoints with the ADMIN_API_KEY shared secret"""
+    if not settings.ADMIN_API_KEY:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled"
         )
 
-    return {
-        "user_id": str(user.id),
-        "email": user.email
-    }
+    if not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), settings.ADMIN_API_KEY.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
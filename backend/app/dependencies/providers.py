@@ -0,0 +1,19 @@
+from fastapi import HTTPException, status
+from app.services.oidc_service import OIDCProviderService
+from app.services.providers import ProviderUnavailableError, provider_registry
+
+
+async def get_provider(provider: str) -> OIDCProviderService:
+    """Dependency resolving the {provider} path parameter to a live provider client"""
+    try:
+        provider_service = await provider_registry.get(provider)
+    except ProviderUnavailableError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Identity provider unavailable"
+        )
+
+    if provider_service is None:
+        raise HTTPException(status_code=400, detail="Invalid provider")
+
+    return provider_service
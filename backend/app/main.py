@@ -1,13 +1,101 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import SQLAlchemyError
 from app.config import settings
-from app.routers import auth, user, link
+from app.database import check_primary, create_sqlite_schema, engine, is_memory_database, replicas, warm_pool
+from app.routers import admin, auth, user, link
+from app.services.providers import evict_idle_providers_periodically, start_providers, stop_providers
+from app.services.event_service import auth_events
+from app.services.health_service import health_prober
+from app.services.revocation_service import revocation_worker
+from app.services.stats_service import auth_stats
+from app.services.token_filter import refresh_token_filter
+from app.utils.capture import TrafficCaptureMiddleware, traffic_recorder
+from app.utils.loop_monitor import LoopMonitorMiddleware, loop_monitor
+from app.utils.metrics import metrics
+from app.utils.read_your_writes import ReadYourWritesMiddleware
+from app.utils.sql_profiler import SqlProfilerMiddleware, install_listeners, sql_profiler
+from app.utils.resilience import breaker_states
+
+
+async def check_replicas_periodically() -> None:
+    """Keep the replica health set current; failing replicas fall back to the primary"""
+    while True:
+        await run_in_threadpool(replicas.check)
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL_SECONDS)
+
+
+async def check_primary_periodically() -> None:
+    """Replace per-checkout pre-ping: detect a dead primary between requests"""
+    while True:
+        await asyncio.sleep(settings.DB_HEALTH_CHECK_SECONDS)
+        if not await run_in_threadpool(check_primary):
+            print("Error: primary database check failed; pooled connections dropped")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm shared resources before serving, release them on shutdown"""
+    app.state.ready = False
+
+    background_tasks = []
+    if settings.EVENT_LOOP_MONITOR:
+        # Started first so blocking during startup is seen too
+        background_tasks.append(asyncio.create_task(loop_monitor.run()))
+
+    try:
+        await run_in_threadpool(create_sqlite_schema)
+        await run_in_threadpool(warm_pool, settings.DB_POOL_MIN_SIZE)
+    except SQLAlchemyError as e:
+        print(f"Error pre-warming database pool: {e}")
+
+    await start_providers()
+    # Readiness starts from a completed probe (each check is bounded by its timeout)
+    await health_prober.probe()
+
+    background_tasks += [
+        asyncio.create_task(health_prober.run()),
+        asyncio.create_task(evict_idle_providers_periodically()),
+        asyncio.create_task(revocation_worker.run()),
+        asyncio.create_task(auth_events.run()),
+        asyncio.create_task(auth_stats.run())
+    ]
+    if settings.REFRESH_TOKEN_FILTER:
+        background_tasks.append(asyncio.create_task(refresh_token_filter.run()))
+    if not settings.db_pool_pre_ping:
+        background_tasks.append(asyncio.create_task(check_primary_periodically()))
+    if replicas.engines:
+        background_tasks.append(asyncio.create_task(check_replicas_periodically()))
+
+    app.state.ready = True
+
+    yield
+
+    app.state.ready = False
+    for task in background_tasks:
+        task.cancel()
+    # Let tasks finish their shutdown work (the event log writes its buffer)
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await stop_providers()
+    if traffic_recorder is not None:
+        traffic_recorder.close()
+    replicas.dispose()
+    # A StaticPool's single connection may still be in use by a cancelled
+    # threadpool job, and an in-memory database goes away with the process anyway
+    if not is_memory_database(settings.DATABASE_URL):
+        engine.dispose()
+
 
 app = FastAPI(
     title="Auth0-Cognito Login System",
     description="Authentication system with AWS Cognito and Auth0 integration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -16,14 +104,32 @@ app.add_middleware(
     allow_origins=settings.cors_origins_list,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
-    expose_headers=["Content-Length", "X-Request-ID"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match", "X-Admin-Key"],
+    expose_headers=["Content-Length", "X-Request-ID", "ETag"],
 )
 
+# Keep a client's reads on the primary shortly after its own writes
+if replicas.engines:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Event loop stall attribution (the sampler runs from the lifespan)
+if settings.EVENT_LOOP_MONITOR:
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+# Per-request SQL statement counts, slow-query log and N+1 detection
+if settings.SQL_PROFILER:
+    install_listeners()
+    app.add_middleware(SqlProfilerMiddleware, profiler=sql_profiler)
+
+# Opt-in traffic capture (TRAFFIC_CAPTURE_FILE) for app.cli.replay_traffic
+if traffic_recorder is not None:
+    app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(user.router, prefix="/api/v1")
 app.include_router(link.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -33,15 +139,31 @@ async def root():
 
 
 @app.get("/api/v1/health")
+@app.get("/api/v1/health/live")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is serving requests (no dependency checks)"""
     return {"status": "healthy", "service": "auth-backend"}
 
 
+@app.get("/api/v1/health/ready")
+async def readiness_check():
+    """Readiness from the cached dependency probes: 503 while starting or not ready"""
+    if not getattr(app.state, "ready", False):
+        return ORJSONResponse(status_code=503, content={"status": "starting"})
+    ready, report = health_prober.readiness()
+    return ORJSONResponse(status_code=200 if ready else 503, content=report)
+
+
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """In-process counters and gauges, plus IdP circuit breaker states"""
+    return {**metrics.snapshot(), "circuit_breakers": breaker_states()}
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": "Internal server error", "detail": str(exc)}
     )
@@ -1,5 +1,8 @@
 from app.models.user import User
 from app.models.linked_identity import LinkedIdentity
 from app.models.refresh_token import RefreshToken
+from app.models.idp_revocation import IdpRevocation
+from app.models.auth_event import AuthEvent
+from app.models.auth_stat import AuthStatHourly
 
-__all__ = ["User", "LinkedIdentity", "RefreshToken"]
+__all__ = ["User", "LinkedIdentity", "RefreshToken", "IdpRevocation", "AuthEvent", "AuthStatHourly"]
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, Index, Uuid
+import uuid
+from app.database import Base
+
+
+class AuthEvent(Base):
+    """Append-only authentication event (monthly range partitions on Postgres)"""
+    __tablename__ = "auth_events"
+
+    # The partition key has to be part of the primary key
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    occurred_at = Column(DateTime(timezone=True), primary_key=True)
+    event_type = Column(String, nullable=False)  # login, refresh, logout, link, unlink, ..._failed
+    user_id = Column(Uuid)  # no foreign key: the log outlives users
+    provider = Column(String)
+    success = Column(Boolean, nullable=False, default=True)
+    detail = Column(JSON)
+
+    __table_args__ = (
+        Index("ix_auth_events_user_occurred", "user_id", "occurred_at"),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from app.database import Base
+
+
+class AuthStatHourly(Base):
+    """Hourly rollup of one authentication counter, per provider"""
+    __tablename__ = "auth_stats_hourly"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # start of the hour (UTC)
+    metric = Column(String, primary_key=True)  # logins, signups, refreshes, links, sessions.opened, ...
+    provider = Column(String, primary_key=True, default="")  # '' when not provider-specific
+    value = Column(BigInteger, nullable=False, default=0)
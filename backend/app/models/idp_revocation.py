@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime, Integer, Index, Uuid, text
+from sqlalchemy.sql import func
+import uuid
+from app.database import Base, utcnow
+
+
+class IdpRevocation(Base):
+    """Pending upstream (IdP) refresh token revocation"""
+    __tablename__ = "idp_revocations"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    provider = Column(String, nullable=False)
+    token = Column(String, nullable=False)  # Fernet-encrypted upstream refresh token
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, server_default=func.now())
+    last_error = Column(String)
+    failed_at = Column(DateTime(timezone=True))  # set once attempts are exhausted
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        # Workers poll pending rows by due time; failed rows stay out of the index
+        Index(
+            "ix_idp_revocations_pending",
+            "next_attempt_at",
+            postgresql_where=text("failed_at IS NULL"),
+            sqlite_where=text("failed_at IS NULL")
+        ),
+    )
@@ -1,20 +1,22 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, LargeBinary, Uuid
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    token_hash = Column(String, nullable=False, unique=True)  # SHA256 hash of refresh token
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, ForeignKey("users.id"), nullable=False)
+    token_hash = Column(String, nullable=True, unique=True)  # legacy: SHA256 hex of the whole token
+    verifier_hash = Column(LargeBinary(32), nullable=True)  # HMAC-SHA256 of the token's verifier part
     expires_at = Column(DateTime(timezone=True), nullable=False)
     revoked = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    upstream_provider = Column(String)  # provider that issued upstream_refresh_token
+    upstream_refresh_token = Column(String)  # Fernet-encrypted IdP refresh token for this session
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
     # Relationship
     user = relationship("User", back_populates="refresh_tokens")
@@ -1,23 +1,34 @@
-from sqlalchemy import Column, String, Boolean, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, JSON, UniqueConstraint, Uuid
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
-from app.database import Base
+from app.database import Base, utcnow
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, nullable=False, index=True)
     email_verified = Column(Boolean, default=False)
     primary_identity_provider = Column(String, nullable=False)  # 'cognito' or 'auth0'
     primary_identity_id = Column(String, nullable=False)  # sub claim from provider
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow)
     last_login_at = Column(DateTime(timezone=True))
+    profile_version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on profile changes
+    profile_document = Column(JSON)  # precomputed /user/profile payload, maintained on write
 
     # Relationships
     linked_identities = relationship("LinkedIdentity", back_populates="user", cascade="all, delete-orphan")
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
+
+    # A provider identity signs in to one account
+    __table_args__ = (
+        UniqueConstraint('primary_identity_provider', 'primary_identity_id', name='uq_users_primary_identity'),
+    )
+
+    def bump_profile_version(self) -> None:
+        """Mark the profile as changed so cached representations revalidate"""
+        # SQL-side increment so concurrent writers never reuse a version
+        self.profile_version = User.profile_version + 1
@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Iterator, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import orjson
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, get_db
+from app.dependencies.auth import require_admin
+from app.services.export_service import ExportService
+from app.services.stats_service import auth_stats
+from app.utils.loop_monitor import loop_monitor
+from app.utils.sql_profiler import sql_profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+export_service = ExportService(batch_size=settings.EXPORT_BATCH_SIZE)
+
+
+def _export_lines(
+    provider: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime]
+) -> Iterator[bytes]:
+    # The response outlives request-scoped dependencies, so the stream owns its session
+    db = SessionLocal()
+    try:
+        for record in export_service.iter_users(db, provider, created_from, created_to):
+            yield orjson.dumps(record) + b"\n"
+    finally:
+        db.close()
+
+
+@router.get("/users/export")
+async def export_users(
+    provider: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream every user with linked identities as NDJSON, in id order"""
+    return StreamingResponse(
+        _export_lines(provider, created_from, created_to),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
+
+
+@router.get("/stats")
+async def get_stats(
+    hours: int = Query(24, ge=1, le=24 * 31),
+    db: Session = Depends(get_db)
+):
+    """Logins, failures, refreshes and link/unlink counts per hour and provider, plus live sessions"""
+    return auth_stats.summary(hours, db)
+
+
+@router.get("/debug/event-loop")
+async def get_event_loop_report():
+    """Event loop lag, blocking time per route and recent stalls with stacks"""
+    return loop_monitor.report()
+
+
+@router.get("/debug/sql")
+async def get_sql_report():
+    """SQL statements and database time per route, N+1 suspects and slow queries"""
+    return sql_profiler.report()
@@ -1,20 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Cookie, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.database import get_db
-from app.services.cognito_service import CognitoService
-from app.services.auth0_service import Auth0Service
+from app.dependencies.providers import get_provider
+from app.services.oidc_service import OIDCProviderService
+from app.services.event_service import auth_events
 from app.services.jwt_service import JWTService
+from app.services.revocation_service import revocation_service, revocation_worker
 from app.services.user_service import UserService
 from app.schemas.auth import LoginResponse, TokenResponse, ErrorResponse
+from app.schemas.serializers import login_response, token_response
+from app.utils.metrics import metrics
 from app.utils.security import generate_state_parameter, hash_token
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-cognito_service = CognitoService()
-auth0_service = Auth0Service()
 jwt_service = JWTService()
 user_service = UserService()
 
@@ -22,77 +24,8 @@ user_service = UserService()
 state_storage = {}
 
 
-@router.post("/login/cognito", response_model=LoginResponse)
-async def login_cognito():
-    """Initiate Cognito OAuth2 flow"""
-    state = generate_state_parameter()
-    state_storage[hash_token(state)] = {"provider": "cognito"}
-
-    authorization_url = cognito_service.get_authorization_url(state)
-
-    return LoginResponse(redirect_url=authorization_url)
-
-
-@router.post("/login/auth0", response_model=LoginResponse)
-async def login_auth0():
-    """Initiate Auth0 OAuth2 flow"""
-    state = generate_state_parameter()
-    state_storage[hash_token(state)] = {"provider": "auth0"}
-
-    authorization_url = auth0_service.get_authorization_url(state)
-
-    return LoginResponse(redirect_url=authorization_url)
-
-
-@router.get("/callback/cognito")
-async def callback_cognito(
-    code: str,
-    state: str,
-    response: Response,
-    db: Session = Depends(get_db)
-):
-    """Handle Cognito OAuth2 callback"""
-    # Verify state
-    state_hash = hash_token(state)
-    if state_hash not in state_storage:
-        raise HTTPException(status_code=400, detail="Invalid state parameter")
-
-    del state_storage[state_hash]
-
-    # Exchange code for tokens
-    tokens = await cognito_service.exchange_code_for_tokens(code)
-    if not tokens:
-        raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
-
-    # Verify ID token
-    id_token_claims = await cognito_service.verify_id_token(tokens["id_token"])
-    if not id_token_claims:
-        raise HTTPException(status_code=400, detail="Invalid ID token")
-
-    # Get user info
-    email = id_token_claims.get("email")
-    identity_id = id_token_claims.get("sub")
-    email_verified = id_token_claims.get("email_verified", False)
-
-    # Get or create user
-    user = user_service.get_user_by_identity("cognito", identity_id, db)
-
-    if not user:
-        user = user_service.create_user(
-            email=email,
-            provider="cognito",
-            identity_id=identity_id,
-            email_verified=email_verified,
-            db=db
-        )
-    else:
-        user_service.update_last_login(str(user.id), db)
-
-    # Create application tokens
-    access_token = jwt_service.create_access_token(str(user.id), user.email)
-    refresh_token = jwt_service.create_refresh_token(str(user.id), db)
-
-    # Set refresh token as httpOnly cookie
+def _set_refresh_cookie(response: Response, refresh_token: str) -> None:
+    """Set refresh token as httpOnly cookie"""
     response.set_cookie(
         key="refresh_token",
         value=refresh_token,
@@ -102,37 +35,47 @@ async def callback_cognito(
         max_age=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
     )
 
-    # Redirect to frontend with access token
-    frontend_url = f"{settings.FRONTEND_URL}?access_token={access_token}"
-    return JSONResponse(
-        content={"redirect_url": frontend_url},
-        headers={"Location": frontend_url}
-    )
 
+@router.post("/login/{provider}", response_model=LoginResponse)
+async def login(
+    provider: str,
+    provider_service: OIDCProviderService = Depends(get_provider)
+):
+    """Initiate OAuth2 flow with a registered provider"""
+    state = generate_state_parameter()
+    state_storage[hash_token(state)] = {"provider": provider}
+
+    authorization_url = provider_service.get_authorization_url(state)
 
-@router.get("/callback/auth0")
-async def callback_auth0(
+    return login_response(authorization_url)
+
+
+@router.get("/callback/{provider}")
+async def callback(
+    provider: str,
     code: str,
     state: str,
-    response: Response,
+    provider_service: OIDCProviderService = Depends(get_provider),
     db: Session = Depends(get_db)
 ):
-    """Handle Auth0 OAuth2 callback"""
-    # Verify state
+    """Handle OAuth2 callback"""
+    # Verify state (issued for this provider)
     state_hash = hash_token(state)
-    if state_hash not in state_storage:
+    state_data = state_storage.pop(state_hash, None)
+    if not state_data or state_data["provider"] != provider:
+        auth_events.emit("login_failed", provider=provider, success=False, detail={"reason": "invalid_state"})
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
-    del state_storage[state_hash]
-
     # Exchange code for tokens
-    tokens = await auth0_service.exchange_code_for_tokens(code)
+    tokens = await provider_service.exchange_code_for_tokens(code)
     if not tokens:
+        auth_events.emit("login_failed", provider=provider, success=False, detail={"reason": "code_exchange"})
         raise HTTPException(status_code=400, detail="Failed to exchange code for tokens")
 
     # Verify ID token
-    id_token_claims = await auth0_service.verify_id_token(tokens["id_token"])
+    id_token_claims = await provider_service.verify_id_token(tokens["id_token"])
     if not id_token_claims:
+        auth_events.emit("login_failed", provider=provider, success=False, detail={"reason": "invalid_id_token"})
         raise HTTPException(status_code=400, detail="Invalid ID token")
 
     # Get user info
@@ -141,44 +84,45 @@ async def callback_auth0(
     email_verified = id_token_claims.get("email_verified", False)
 
     # Get or create user
-    user = user_service.get_user_by_identity("auth0", identity_id, db)
+    user = user_service.get_user_by_identity(provider, identity_id, db)
 
     if not user:
         user = user_service.create_user(
             email=email,
-            provider="auth0",
+            provider=provider,
             identity_id=identity_id,
             email_verified=email_verified,
             db=db
         )
+        auth_events.emit("signup", user_id=user.id, provider=provider)
     else:
-        user_service.update_last_login(str(user.id), db)
+        user_service.update_last_login(str(user.id), db, user=user)
+    auth_events.emit("login", user_id=user.id, provider=provider)
 
     # Create application tokens
     access_token = jwt_service.create_access_token(str(user.id), user.email)
-    refresh_token = jwt_service.create_refresh_token(str(user.id), db)
-
-    # Set refresh token as httpOnly cookie
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=True,
-        secure=settings.APP_ENV == "production",
-        samesite="strict",
-        max_age=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    refresh_token = jwt_service.create_refresh_token(
+        str(user.id),
+        db,
+        upstream_provider=provider,
+        upstream_refresh_token=revocation_service.seal(tokens.get("refresh_token"))
     )
 
     # Redirect to frontend with access token
     frontend_url = f"{settings.FRONTEND_URL}?access_token={access_token}"
-    return JSONResponse(
+    callback_response = ORJSONResponse(
         content={"redirect_url": frontend_url},
         headers={"Location": frontend_url}
     )
 
+    # Set refresh token on the returned response (a returned response does
+    # not inherit cookies from the injected one)
+    _set_refresh_cookie(callback_response, refresh_token)
+    return callback_response
+
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(
-    response: Response,
     refresh_token: Optional[str] = Cookie(None),
     db: Session = Depends(get_db)
 ):
@@ -192,6 +136,7 @@ async def refresh_token(
     # Verify refresh token
     payload = jwt_service.verify_refresh_token(refresh_token, db)
     if not payload:
+        auth_events.emit("refresh_failed", success=False, detail={"reason": "invalid_refresh_token"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token"
@@ -206,22 +151,35 @@ async def refresh_token(
             detail="User not found"
         )
 
+    # Rotate refresh token once it has aged past the rotation threshold
+    new_refresh_token = None
+    if jwt_service.should_rotate_refresh_token(payload):
+        new_refresh_token = jwt_service.rotate_refresh_token(refresh_token, str(user.id), db)
+        if new_refresh_token is None:
+            # Revoked or rotated by another request since it was verified
+            auth_events.emit(
+                "refresh_failed", user_id=user.id, success=False, detail={"reason": "refresh_token_not_live"}
+            )
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token"
+            )
+    else:
+        metrics.increment("refresh_token.rotation.skipped")
+
     # Create new access token
     new_access_token = jwt_service.create_access_token(str(user.id), user.email)
 
-    # Optionally rotate refresh token
-    new_refresh_token = jwt_service.rotate_refresh_token(refresh_token, str(user.id), db)
+    auth_events.emit("refresh", user_id=user.id, detail={
+        "rotated": new_refresh_token is not None,
+        "session_expires_at": payload["expires_at"].isoformat()
+    })
+
+    token_json = token_response(new_access_token)
     if new_refresh_token:
-        response.set_cookie(
-            key="refresh_token",
-            value=new_refresh_token,
-            httponly=True,
-            secure=settings.APP_ENV == "production",
-            samesite="strict",
-            max_age=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
-        )
+        _set_refresh_cookie(token_json, new_refresh_token)
 
-    return TokenResponse(access_token=new_access_token)
+    return token_json
 
 
 @router.post("/logout")
@@ -232,8 +190,17 @@ async def logout(
 ):
     """Logout user and revoke tokens"""
     if refresh_token:
-        # Revoke refresh token
-        jwt_service.revoke_refresh_token(refresh_token, db)
+        # Revoke refresh token; the IdP session is revoked in the background
+        revoked = jwt_service.revoke_refresh_token(refresh_token, db, revoke_upstream=True)
+        if revoked:
+            auth_events.emit(
+                "logout",
+                user_id=revoked.user_id,
+                provider=revoked.upstream_provider,
+                detail={"session_expires_at": revoked.expires_at.isoformat()}
+            )
+        if revoked and revoked.upstream_provider:
+            revocation_worker.notify()
 
     # Clear refresh token cookie
     response.delete_cookie(key="refresh_token")
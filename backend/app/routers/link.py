@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import Dict
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.services.cognito_service import CognitoService
-from app.services.auth0_service import Auth0Service
+from app.dependencies.auth import get_current_user, get_authenticated_user_with_identities
+from app.models.user import User
+from app.dependencies.providers import get_provider
+from app.services.oidc_service import OIDCProviderService
+from app.services.providers import provider_registry
+from app.services.event_service import auth_events
 from app.services.link_service import LinkService
+from app.services.user_service import Principal
+from app.services.revocation_service import revocation_service, revocation_worker
 from app.schemas.auth import LoginResponse
+from app.schemas.serializers import login_response
 from app.utils.security import generate_state_parameter, hash_token
 
 router = APIRouter(prefix="/link", tags=["account-linking"])
 
-cognito_service = CognitoService()
-auth0_service = Auth0Service()
 link_service = LinkService()
 
 # In-memory state storage (use Redis in production)
@@ -22,24 +25,19 @@ link_state_storage = {}
 @router.post("/start/{provider}", response_model=LoginResponse)
 async def start_linking(
     provider: str,
-    current_user: Dict = Depends(get_current_user)
+    provider_service: OIDCProviderService = Depends(get_provider),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Initiate account linking flow"""
-    if provider not in ["cognito", "auth0"]:
-        raise HTTPException(status_code=400, detail="Invalid provider")
-
     state = generate_state_parameter()
     link_state_storage[hash_token(state)] = {
         "provider": provider,
-        "user_id": current_user["user_id"]
+        "user_id": current_user.user_id
     }
 
-    if provider == "cognito":
-        authorization_url = cognito_service.get_authorization_url(state)
-    else:
-        authorization_url = auth0_service.get_authorization_url(state)
+    authorization_url = provider_service.get_authorization_url(state)
 
-    return LoginResponse(redirect_url=authorization_url)
+    return login_response(authorization_url)
 
 
 @router.get("/callback/{provider}")
@@ -47,34 +45,33 @@ async def link_callback(
     provider: str,
     code: str,
     state: str,
+    provider_service: OIDCProviderService = Depends(get_provider),
     db: Session = Depends(get_db)
 ):
     """Handle account linking callback"""
-    # Verify state
+    # Verify state (issued for this provider)
     state_hash = hash_token(state)
-    if state_hash not in link_state_storage:
+    state_data = link_state_storage.pop(state_hash, None)
+    if not state_data or state_data["provider"] != provider:
+        auth_events.emit("link_failed", provider=provider, success=False, detail={"reason": "invalid_state"})
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
-    state_data = link_state_storage[state_hash]
-    del link_state_storage[state_hash]
-
     user_id = state_data["user_id"]
 
     # Exchange code for tokens
-    if provider == "cognito":
-        tokens = await cognito_service.exchange_code_for_tokens(code)
-        if not tokens:
-            raise HTTPException(status_code=400, detail="Failed to exchange code")
-
-        id_token_claims = await cognito_service.verify_id_token(tokens["id_token"])
-    else:
-        tokens = await auth0_service.exchange_code_for_tokens(code)
-        if not tokens:
-            raise HTTPException(status_code=400, detail="Failed to exchange code")
+    tokens = await provider_service.exchange_code_for_tokens(code)
+    if not tokens:
+        auth_events.emit(
+            "link_failed", user_id=user_id, provider=provider, success=False, detail={"reason": "code_exchange"}
+        )
+        raise HTTPException(status_code=400, detail="Failed to exchange code")
 
-        id_token_claims = await auth0_service.verify_id_token(tokens["id_token"])
+    id_token_claims = await provider_service.verify_id_token(tokens["id_token"])
 
     if not id_token_claims:
+        auth_events.emit(
+            "link_failed", user_id=user_id, provider=provider, success=False, detail={"reason": "invalid_id_token"}
+        )
         raise HTTPException(status_code=400, detail="Invalid ID token")
 
     # Get identity information
@@ -83,25 +80,36 @@ async def link_callback(
 
     # Link identity
     try:
-        link_service.link_identity(user_id, provider, identity_id, email, db)
+        link_service.link_identity(
+            user_id,
+            provider,
+            identity_id,
+            email,
+            db,
+            upstream_refresh_token=revocation_service.seal(tokens.get("refresh_token"))
+        )
+        auth_events.emit("link", user_id=user_id, provider=provider)
         return {"message": f"Successfully linked {provider} account", "success": True}
     except ValueError as e:
+        auth_events.emit("link_failed", user_id=user_id, provider=provider, success=False, detail={"reason": str(e)})
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{provider}")
 async def unlink_identity(
     provider: str,
-    current_user: Dict = Depends(get_current_user),
+    user: User = Depends(get_authenticated_user_with_identities),
     db: Session = Depends(get_db)
 ):
     """Unlink identity provider from account"""
-    if provider not in ["cognito", "auth0"]:
+    if not provider_registry.has(provider):
         raise HTTPException(status_code=400, detail="Invalid provider")
 
     try:
-        success = link_service.unlink_identity(current_user["user_id"], provider, db)
+        success = link_service.unlink_identity(str(user.id), provider, db, user=user)
         if success:
+            auth_events.emit("unlink", user_id=user.id, provider=provider)
+            revocation_worker.notify()
             return {"message": f"Successfully unlinked {provider} account"}
         else:
             raise HTTPException(status_code=404, detail="Linked identity not found")
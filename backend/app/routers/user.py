@@ -1,25 +1,83 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.dependencies.auth import get_current_user
-from app.services.user_service import UserService
-from app.schemas.user import UserProfileResponse
-from typing import Dict
+from app.dependencies.auth import get_current_user, get_current_user_id, user_not_found
+from app.services.event_service import auth_events, event_cursor, parse_event_cursor
+from app.services.user_service import Principal, UserService
+from app.schemas.user import AuthEventListResponse, UserProfileResponse
+from app.schemas.serializers import user_profile_response
+from app.utils.http_cache import PROFILE_CACHE_CONTROL, if_none_match, profile_etag
 
 router = APIRouter(prefix="/user", tags=["user"])
 
 user_service = UserService()
 
 
-@router.get("/profile", response_model=UserProfileResponse)
+@router.get(
+    "/profile",
+    response_model=UserProfileResponse,
+    responses={304: {"description": "Profile unchanged since the given ETag"}}
+)
 async def get_profile(
-    current_user: Dict = Depends(get_current_user),
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get user profile with linked identities"""
-    user_profile = user_service.get_user_profile(current_user["user_id"], db)
+    # One row query serves both the ETag check and the stored document
+    profile_state = user_service.get_profile_state(user_id, db)
+    if profile_state is None:
+        raise user_not_found()
+
+    cache_headers = {
+        "ETag": profile_etag(user_id, profile_state.profile_version),
+        "Cache-Control": PROFILE_CACHE_CONTROL,
+        "Vary": "Authorization"
+    }
+
+    # Unchanged profile: answer without serializing the document
+    if if_none_match(request.headers.get("if-none-match"), cache_headers["ETag"]):
+        return Response(status_code=304, headers=cache_headers)
+
+    user_profile = profile_state.profile_document
+    if user_profile is None:
+        # Not backfilled yet
+        user_profile = user_service.get_user_profile(user_id, db)
 
     if not user_profile:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return user_profile
+    response = user_profile_response(user_profile)
+    response.headers.update(cache_headers)
+    return response
+
+
+@router.get("/events", response_model=AuthEventListResponse)
+async def get_events(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the current user's recent authentication events (page with ?cursor=<next_cursor>)"""
+    after = None
+    if cursor is not None:
+        after = parse_event_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    events = auth_events.recent_events(current_user.user_id, db, limit=limit, after=after)
+    return {
+        "events": [
+            {
+                "event_type": event.event_type,
+                "provider": event.provider,
+                "success": event.success,
+                "occurred_at": event.occurred_at,
+                "detail": event.detail
+            }
+            for event in events
+        ],
+        "next_cursor": event_cursor(events[-1]) if len(events) == limit else None
+    }
@@ -0,0 +1,43 @@
+"""
+Pre-built serializers for the hot response schemas.
+
+Routes declare ``response_model`` for the OpenAPI docs but return these
+responses directly, so FastAPI skips re-validating the payload and orjson
+encodes it in one pass. Each function emits exactly the fields of its schema.
+"""
+from typing import Dict
+from fastapi.responses import ORJSONResponse
+
+
+def token_response(access_token: str, token_type: str = "bearer") -> ORJSONResponse:
+    """Serialize a TokenResponse"""
+    return ORJSONResponse(content={
+        "access_token": access_token,
+        "token_type": token_type
+    })
+
+
+def login_response(redirect_url: str) -> ORJSONResponse:
+    """Serialize a LoginResponse"""
+    return ORJSONResponse(content={"redirect_url": redirect_url})
+
+
+def _linked_identity(identity: Dict) -> Dict:
+    return {
+        "provider": identity["provider"],
+        "email": identity["email"],
+        "linked_at": identity.get("linked_at")
+    }
+
+
+def user_profile_response(profile: Dict) -> ORJSONResponse:
+    """Serialize a UserProfileResponse from a profile dict"""
+    return ORJSONResponse(content={
+        "id": profile["id"],
+        "email": profile["email"],
+        "email_verified": bool(profile["email_verified"]),
+        "primary_provider": profile["primary_provider"],
+        "created_at": profile.get("created_at"),
+        "last_login_at": profile.get("last_login_at"),
+        "linked_identities": [_linked_identity(li) for li in profile.get("linked_identities", [])]
+    })
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -19,3 +19,18 @@ class UserProfileResponse(BaseModel):
     created_at: Optional[str] = None
     last_login_at: Optional[str] = None
     linked_identities: List[LinkedIdentitySchema] = []
+
+
+class AuthEventSchema(BaseModel):
+    """Authentication event"""
+    event_type: str
+    provider: Optional[str] = None
+    success: bool
+    occurred_at: datetime
+    detail: Optional[Dict[str, Any]] = None
+
+
+class AuthEventListResponse(BaseModel):
+    """A page of a user's authentication events, newest first"""
+    events: List[AuthEventSchema] = []
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last
@@ -0,0 +1,120 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from app.config import settings
+from app.utils.resilience import call_with_resilience, get_breaker
+
+
+class BaseProviderService:
+    """
+    Shared HTTP client and key cache for identity provider services.
+
+    close() may come while requests are in flight (the registry evicts
+    providers that handlers still hold): the client is then closed when the
+    last of them finishes, and a request started after close() gets a client
+    of its own that is closed with it.
+    """
+
+    # Set by subclasses
+    name: str = ""
+    jwks_url: str = ""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._closed = False
+        self.jwks: Optional[Dict] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created on first use if start() was not called"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.IDP_HTTP_TIMEOUT_SECONDS,
+                    connect=settings.IDP_HTTP_CONNECT_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.IDP_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.IDP_HTTP_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _in_use(self) -> AsyncIterator[None]:
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._closed and self._in_flight == 0:
+                await self._close_client()
+
+    async def request(
+        self,
+        endpoint: str,
+        method: str,
+        url: str,
+        idempotent: bool,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Call a provider endpoint behind its own circuit breaker.
+        Only idempotent calls are retried or hedged; a token exchange is sent once.
+        Raises httpx.HTTPError on failure, including when the breaker is open.
+        """
+        breaker = get_breaker(
+            f"{self.name}.{endpoint}",
+            settings.IDP_BREAKER_FAILURE_THRESHOLD,
+            settings.IDP_BREAKER_RESET_SECONDS
+        )
+        async with self._in_use():
+            return await call_with_resilience(
+                breaker,
+                lambda: self.client.request(method, url, **kwargs),
+                idempotent=idempotent,
+                retries=settings.IDP_RETRY_ATTEMPTS,
+                backoff_seconds=settings.IDP_RETRY_BACKOFF_SECONDS,
+                hedge_delay=settings.IDP_HEDGE_DELAY_SECONDS
+            )
+
+    def warm_urls(self) -> List[str]:
+        """Additional hosts to pre-connect to besides the JWKS endpoint"""
+        return []
+
+    async def start(self) -> None:
+        """Open connections to the provider and prefetch its signing keys"""
+        await self.get_jwks(refresh=True)
+
+        async with self._in_use():
+            for url in self.warm_urls():
+                try:
+                    # Any response will do; this only establishes the TLS connection
+                    await self.client.head(url)
+                except httpx.HTTPError as e:
+                    print(f"Error pre-connecting to {url}: {e}")
+
+    async def close(self) -> None:
+        """Close pooled connections, once the requests in flight have finished"""
+        self._closed = True
+        if self._in_flight == 0:
+            await self._close_client()
+
+    async def _close_client(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_jwks(self, refresh: bool = False) -> Optional[Dict]:
+        """Get the provider's JSON Web Key Set, cached after the first fetch"""
+        if self.jwks is not None and not refresh:
+            return self.jwks
+
+        try:
+            response = await self.request("jwks", "GET", self.jwks_url, idempotent=True)
+            self.jwks = response.json()
+        except httpx.HTTPError as e:
+            print(f"Error fetching JWKS: {e}")
+
+        return self.jwks
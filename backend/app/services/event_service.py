@@ -0,0 +1,237 @@
+import asyncio
+import base64
+import binascii
+import threading
+import uuid
+from collections import deque
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, insert, select, text, tuple_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, engine, read_only
+from app.models.auth_event import AuthEvent
+from app.utils.metrics import metrics
+
+# Built once per process so each call reuses the cached compiled statement
+_INSERT_EVENTS = insert(AuthEvent)
+# Newest first; id breaks ties between events with the same occurred_at, so
+# pages resume after exactly the last (occurred_at, id) returned
+_EVENTS_BY_USER = (
+    select(AuthEvent)
+    .where(AuthEvent.user_id == bindparam("user_id"))
+    .order_by(AuthEvent.occurred_at.desc(), AuthEvent.id.desc())
+    .limit(bindparam("limit"))
+)
+_EVENTS_BY_USER_AFTER_CURSOR = _EVENTS_BY_USER.where(
+    tuple_(AuthEvent.occurred_at, AuthEvent.id) < tuple_(
+        bindparam("before", type_=AuthEvent.occurred_at.type),
+        bindparam("before_id", type_=AuthEvent.id.type)
+    )
+)
+
+
+def event_cursor(event: AuthEvent) -> str:
+    """Opaque cursor for the page after event"""
+    key = f"{event.occurred_at.isoformat()}|{event.id.hex}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def parse_event_cursor(cursor: str) -> Optional[Tuple[datetime, uuid.UUID]]:
+    """(occurred_at, id) from an event_cursor, or None if it is malformed"""
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        occurred_at, event_id = key.split("|")
+        return datetime.fromisoformat(occurred_at), uuid.UUID(event_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _month_start(day: date, months_ahead: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 + months_ahead
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class AuthEventLog:
+    """
+    Authentication events buffered in memory and written in batches.
+    emit() never touches the database: events go into a bounded buffer that a
+    background task drains with one multi-row INSERT per batch. When the
+    buffer is full new events are dropped and counted instead of blocking
+    the request.
+    """
+
+    def __init__(self, capacity: int, batch_size: int, flush_seconds: float):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer: deque = deque()
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._partitions_until: Optional[date] = None
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Call callback(event) synchronously for every emitted event"""
+        self._subscribers.append(callback)
+
+    def emit(
+        self,
+        event_type: str,
+        user_id: Optional[str] = None,
+        provider: Optional[str] = None,
+        success: bool = True,
+        detail: Optional[Dict] = None
+    ) -> None:
+        """Record an event without waiting for the database"""
+        event = {
+            "id": uuid.uuid4(),
+            "occurred_at": datetime.now(timezone.utc),
+            "event_type": event_type,
+            "user_id": uuid.UUID(str(user_id)) if user_id else None,
+            "provider": provider,
+            "success": success,
+            "detail": detail
+        }
+
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in auth event subscriber: {e}")
+
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                metrics.increment("auth_events.dropped")
+                return
+            self._buffer.append(event)
+            depth = len(self._buffer)
+
+        metrics.increment("auth_events.emitted")
+        # Backpressure: a full batch is flushed now rather than at the next tick
+        if depth >= self.batch_size:
+            self._notify()
+
+    def _notify(self) -> None:
+        if self._wakeup is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            # Emitted from a threadpool route
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _take_batch(self) -> List[Dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: List[Dict]) -> None:
+        """Put a failed batch back in front, dropping what no longer fits"""
+        with self._lock:
+            room = max(0, self.capacity - len(self._buffer))
+            kept = batch[:room]
+            self._buffer.extendleft(reversed(kept))
+        if len(kept) < len(batch):
+            metrics.increment("auth_events.dropped", len(batch) - len(kept))
+
+    def write_batch(self, batch: List[Dict], db: Session) -> None:
+        """Insert a batch in one statement (multi-row VALUES via executemany)"""
+        db.execute(_INSERT_EVENTS, batch)
+        db.commit()
+
+    def flush(self) -> int:
+        """Write everything buffered so far, returning the number of events written"""
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                break
+
+            db = SessionLocal()
+            try:
+                self.write_batch(batch, db)
+            except Exception as e:
+                print(f"Error writing auth events: {e}")
+                self._requeue(batch)
+                metrics.increment("auth_events.write_errors")
+                break
+            finally:
+                db.close()
+
+            written += len(batch)
+            metrics.increment("auth_events.written", len(batch))
+
+        with self._lock:
+            metrics.set_gauge("auth_events.buffered", len(self._buffer))
+        return written
+
+    def ensure_partitions(self, months_ahead: int = 2) -> None:
+        """Create monthly auth_events partitions up to months_ahead (Postgres only)"""
+        if engine.dialect.name != "postgresql":
+            return
+
+        today = datetime.now(timezone.utc).date()
+        if self._partitions_until is not None and _month_start(today, months_ahead) < self._partitions_until:
+            return
+
+        with engine.begin() as connection:
+            for offset in range(months_ahead + 1):
+                start = _month_start(today, offset)
+                end = _month_start(today, offset + 1)
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS auth_events_{start:%Y_%m} PARTITION OF auth_events "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                ))
+        self._partitions_until = _month_start(today, months_ahead + 1)
+
+    async def run(self) -> None:
+        """Flush every flush_seconds, or as soon as a full batch is buffered, until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                try:
+                    await run_in_threadpool(self.ensure_partitions)
+                except Exception as e:
+                    print(f"Error creating auth event partitions: {e}")
+                await run_in_threadpool(self.flush)
+        finally:
+            # Shutdown: write what is still buffered
+            self.flush()
+
+    def recent_events(
+        self,
+        user_id: str,
+        db: Session,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, uuid.UUID]] = None
+    ) -> List[AuthEvent]:
+        """A user's events, newest first (page with after=parse_event_cursor(<cursor>))"""
+        params = {"user_id": uuid.UUID(user_id), "limit": limit}
+        statement = _EVENTS_BY_USER
+        if after is not None:
+            params["before"], params["before_id"] = after
+            statement = _EVENTS_BY_USER_AFTER_CURSOR
+        return read_only(db, lambda session: session.scalars(statement, params).all())
+
+
+# Global auth event log
+auth_events = AuthEventLog(
+    capacity=settings.AUTH_EVENT_BUFFER_SIZE,
+    batch_size=settings.AUTH_EVENT_BATCH_SIZE,
+    flush_seconds=settings.AUTH_EVENT_FLUSH_SECONDS
+)
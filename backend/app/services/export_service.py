@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from app.database import read_only
+from app.models.user import User
+from app.models.linked_identity import LinkedIdentity
+
+# Exported columns only; profile_document and other heavy columns stay on disk
+_USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.email_verified,
+    User.primary_identity_provider,
+    User.primary_identity_id,
+    User.created_at,
+    User.last_login_at,
+)
+
+
+class ExportService:
+    """Stream the user directory in primary-key order"""
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    def _user_batch(
+        self,
+        db: Session,
+        after_id,
+        provider: Optional[str],
+        created_from: Optional[datetime],
+        created_to: Optional[datetime]
+    ) -> List:
+        """Next page of users after after_id (keyset pagination on id)"""
+        stmt = select(*_USER_COLUMNS).order_by(User.id).limit(self.batch_size)
+
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
+        if provider:
+            # Primary provider, or any identity linked from that provider
+            stmt = stmt.where(or_(
+                User.primary_identity_provider == provider,
+                select(LinkedIdentity.id).where(
+                    LinkedIdentity.user_id == User.id,
+                    LinkedIdentity.identity_provider == provider
+                ).exists()
+            ))
+        if created_from is not None:
+            stmt = stmt.where(User.created_at >= created_from)
+        if created_to is not None:
+            stmt = stmt.where(User.created_at < created_to)
+
+        return db.execute(stmt).all()
+
+    def _identities_for(self, db: Session, user_ids: List) -> Dict:
+        """Linked identities for one batch of users, grouped by user id"""
+        stmt = (
+            select(
+                LinkedIdentity.user_id,
+                LinkedIdentity.identity_provider,
+                LinkedIdentity.identity_id,
+                LinkedIdentity.provider_email,
+                LinkedIdentity.linked_at
+            )
+            .where(LinkedIdentity.user_id.in_(user_ids))
+            .order_by(LinkedIdentity.user_id, LinkedIdentity.linked_at)
+        )
+
+        grouped: Dict = {}
+        for row in db.execute(stmt):
+            grouped.setdefault(row.user_id, []).append({
+                "provider": row.identity_provider,
+                "identity_id": row.identity_id,
+                "email": row.provider_email,
+                "linked_at": row.linked_at
+            })
+        return grouped
+
+    def iter_users(
+        self,
+        db: Session,
+        provider: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield one export record per user, holding at most one batch in memory.
+        Each batch is two queries (users, then their linked identities) and
+        releases its connection before the records are consumed.
+        """
+        last_id = None
+
+        while True:
+            def fetch_batch(session: Session):
+                users = self._user_batch(session, last_id, provider, created_from, created_to)
+                identities = self._identities_for(session, [row.id for row in users]) if users else {}
+                return users, identities
+
+            try:
+                users, identities = read_only(db, fetch_batch)
+            finally:
+                # Don't hold a pooled connection while a slow consumer drains the batch
+                db.rollback()
+
+            if not users:
+                return
+
+            for row in users:
+                yield {
+                    "id": row.id,
+                    "email": row.email,
+                    "email_verified": row.email_verified,
+                    "primary_identity_provider": row.primary_identity_provider,
+                    "primary_identity_id": row.primary_identity_id,
+                    "created_at": row.created_at,
+                    "last_login_at": row.last_login_at,
+                    "linked_identities": identities.get(row.id, [])
+                }
+
+            last_id = users[-1].id
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Set, Tuple
+import httpx
+from alembic.script import ScriptDirectory
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ProgrammingError, SQLAlchemyError
+from app.config import settings
+from app.database import engine
+from app.services.providers import DEFAULT_PROVIDERS, ProviderUnavailableError, provider_registry
+from app.utils.metrics import metrics
+
+ALEMBIC_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic")
+
+_ALEMBIC_VERSION = text("SELECT version_num FROM alembic_version")
+_PING = text("SELECT 1")
+# SQLite schemas come from create_sqlite_schema, not Alembic
+_UNMANAGED_SCHEMA = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+
+def migration_revisions() -> Tuple[Optional[str], Set[str]]:
+    """Head revision of the migrations shipped with this code, and every known revision"""
+    script = ScriptDirectory(ALEMBIC_DIRECTORY)
+    return script.get_current_head(), {revision.revision for revision in script.walk_revisions()}
+
+
+def _pool_status() -> Dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        # SQLite StaticPool/NullPool have no sizing
+        return {}
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+
+
+def _probe_database() -> Dict:
+    """Ping the primary and read its migration version (runs in the threadpool)"""
+    started = time.perf_counter()
+    version = None
+    with engine.connect() as connection:
+        if _UNMANAGED_SCHEMA:
+            connection.execute(_PING)
+        else:
+            try:
+                version = connection.execute(_ALEMBIC_VERSION).scalar()
+            except ProgrammingError:
+                pass  # reachable, but never migrated
+    return {"latency_ms": round((time.perf_counter() - started) * 1000, 1), "version": version}
+
+
+class HealthProber:
+    """
+    Dependency checks for readiness, run in the background every
+    interval_seconds so /health/ready only reads cached results: orchestrator
+    probes cost no database or IdP traffic and never wait on either.
+
+    The process is ready while the primary answered within timeout_seconds,
+    its migration version is not behind this code's head, and the results
+    are younger than ttl_seconds. An unreachable identity provider is
+    reported (degraded) without failing readiness, since every instance would
+    fail it alike. A database ahead of the head (a newer release migrated
+    during a rolling deploy) is accepted.
+    """
+
+    def __init__(self, interval_seconds: float, ttl_seconds: float, timeout_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.head, self._revisions = migration_revisions()
+        self._results: Dict[str, Dict] = {}
+        self._checked_at: Optional[float] = None
+        self._database_probe: Optional[asyncio.Future] = None
+
+    async def _check_database(self) -> Dict:
+        # A probe stuck on a hung connection keeps its thread; don't start another
+        if self._database_probe is None or self._database_probe.done():
+            self._database_probe = asyncio.ensure_future(run_in_threadpool(_probe_database))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(self._database_probe), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            return {"status": "failing", "error": f"no answer within {self.timeout_seconds}s", **_pool_status()}
+        except SQLAlchemyError as e:
+            return {"status": "failing", "error": type(e).__name__, **_pool_status()}
+
+        version = result["version"]
+        if version is None:
+            migration_status = "unmanaged" if _UNMANAGED_SCHEMA else "missing"
+        elif version == self.head:
+            migration_status = "ok"
+        elif version in self._revisions:
+            migration_status = "behind"
+        else:
+            migration_status = "ahead"
+
+        return {
+            "status": "failing" if migration_status in ("behind", "missing") else "ok",
+            "latency_ms": result["latency_ms"],
+            "migrations": {"current": version, "head": self.head, "status": migration_status},
+            **_pool_status()
+        }
+
+    async def _check_provider(self, name: str) -> Dict:
+        started = time.perf_counter()
+        try:
+            provider = await asyncio.wait_for(provider_registry.get(name), self.timeout_seconds)
+            if provider is None:
+                return {"status": "failing", "error": "not registered"}
+            # Any HTTP answer shows the issuer is reachable; discovery may be cached
+            await asyncio.wait_for(
+                provider.request("health", "GET", provider.discovery_url, idempotent=True),
+                self.timeout_seconds
+            )
+        except (ProviderUnavailableError, httpx.HTTPError, asyncio.TimeoutError) as e:
+            return {"status": "failing", "error": str(e) or type(e).__name__}
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    async def probe(self) -> Dict[str, Dict]:
+        """Run every check concurrently and cache the results"""
+        names = ["database"] + [f"provider:{name}" for name in DEFAULT_PROVIDERS]
+        checks = [self._check_database()] + [self._check_provider(name) for name in DEFAULT_PROVIDERS]
+        results = dict(zip(names, await asyncio.gather(*checks)))
+
+        self._results = results
+        self._checked_at = time.monotonic()
+        for name, result in results.items():
+            metrics.set_gauge(f"health.{name}.ok", int(result["status"] == "ok"))
+        return results
+
+    async def run(self) -> None:
+        """Probe every interval_seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.probe()
+            except Exception as e:
+                print(f"Error probing dependencies: {e}")
+
+    def readiness(self) -> Tuple[bool, Dict]:
+        """Whether the process should receive traffic, with the cached check results"""
+        if self._checked_at is None:
+            return False, {"status": "starting"}
+
+        age = time.monotonic() - self._checked_at
+        stale = age > self.ttl_seconds
+        database_ok = self._results["database"]["status"] == "ok"
+        degraded = any(result["status"] != "ok" for result in self._results.values())
+        ready = database_ok and not stale
+
+        status = "stale" if stale else "not_ready" if not ready else "degraded" if degraded else "ready"
+        return ready, {"status": status, "checked_seconds_ago": round(age, 1), "checks": self._results}
+
+
+# Global dependency prober
+health_prober = HealthProber(
+    interval_seconds=settings.HEALTH_PROBE_INTERVAL_SECONDS,
+    ttl_seconds=settings.HEALTH_PROBE_TTL_SECONDS,
+    timeout_seconds=settings.HEALTH_PROBE_TIMEOUT_SECONDS
+)
@@ -1,13 +1,42 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
 from jose import jwt, JWTError
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.models.refresh_token import RefreshToken
-from app.utils.security import generate_secure_token, hash_token
+from app.services.revocation_service import revocation_service
+from app.services.token_filter import refresh_token_filter
+from app.utils.metrics import metrics
+from app.utils.security import generate_secure_token, hash_token, hash_verifier, split_selector_token, uuid7
+import hashlib
+import hmac
 import uuid
 
 
+# Built once per process so each call reuses the cached compiled statement
+_LIVE_TOKEN_BY_ID = select(RefreshToken).where(
+    RefreshToken.id == bindparam("token_id"),
+    RefreshToken.revoked == False
+)
+_TOKEN_BY_ID = select(RefreshToken).where(RefreshToken.id == bindparam("token_id"))
+# Legacy tokens (SHA256 hex of the whole token), valid until they expire
+_LIVE_TOKEN_BY_HASH = select(RefreshToken).where(
+    RefreshToken.token_hash == bindparam("token_hash"),
+    RefreshToken.revoked == False
+).limit(1)
+_TOKEN_BY_HASH = select(RefreshToken).where(
+    RefreshToken.token_hash == bindparam("token_hash")
+).limit(1)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC so they compare with aware ones"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
 class JWTService:
     """Service for JWT token operations"""
 
@@ -16,6 +45,11 @@ class JWTService:
         self.algorithm = settings.JWT_ALGORITHM
         self.access_token_expire_minutes = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_days = settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS
+        self.refresh_rotation_threshold = settings.JWT_REFRESH_ROTATION_THRESHOLD
+
+        hmac_key = settings.REFRESH_TOKEN_HMAC_KEY or settings.JWT_SECRET_KEY
+        self.verifier_key = hashlib.sha256(f"refresh-token-verifier:{hmac_key}".encode()).digest()
+        self.revocation_service = revocation_service
 
     def create_access_token(self, user_id: str, email: str) -> str:
         """Create short-lived access token (15 minutes)"""
@@ -33,27 +67,59 @@ class JWTService:
 
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
-    def create_refresh_token(self, user_id: str, db: Session) -> str:
-        """Create long-lived refresh token (7 days) and store hash in database"""
-        # Generate random token
-        token = generate_secure_token(64)
-        token_hash = hash_token(token)
+    def create_refresh_token(
+        self,
+        user_id: str,
+        db: Session,
+        upstream_provider: Optional[str] = None,
+        upstream_refresh_token: Optional[str] = None
+    ) -> str:
+        """
+        Create long-lived refresh token (7 days) as '<selector>.<verifier>'.
+        The selector is the row's primary key, a UUIDv7 so the token carries
+        its issue time; only a keyed hash of the verifier is stored. upstream_refresh_token is the session's sealed
+        IdP refresh token, revoked upstream on logout.
+        """
+        selector = uuid7()
+        verifier = generate_secure_token(32)
 
         # Calculate expiration
         expires_at = datetime.utcnow() + timedelta(days=self.refresh_token_expire_days)
 
-        # Store hash in database
+        # Store verifier hash in database
         refresh_token_record = RefreshToken(
+            id=selector,
             user_id=uuid.UUID(user_id) if isinstance(user_id, str) else user_id,
-            token_hash=token_hash,
+            verifier_hash=hash_verifier(verifier, self.verifier_key),
             expires_at=expires_at,
-            revoked=False
+            revoked=False,
+            upstream_provider=upstream_provider if upstream_refresh_token else None,
+            upstream_refresh_token=upstream_refresh_token
         )
 
         db.add(refresh_token_record)
         db.commit()
 
-        return token
+        return f"{selector.hex}.{verifier}"
+
+    def _find_refresh_token(self, token: str, db: Session, live_only: bool) -> Optional[RefreshToken]:
+        """Look up a refresh token row by selector (or legacy hash) and check its verifier"""
+        parsed = split_selector_token(token)
+        if parsed is None:
+            statement = _LIVE_TOKEN_BY_HASH if live_only else _TOKEN_BY_HASH
+            return db.scalars(statement, {"token_hash": hash_token(token)}).first()
+
+        selector, verifier = parsed
+        statement = _LIVE_TOKEN_BY_ID if live_only else _TOKEN_BY_ID
+        refresh_token = db.scalars(statement, {"token_id": selector}).first()
+        if not refresh_token or refresh_token.verifier_hash is None:
+            return None
+
+        # Constant-time comparison of the stored and presented verifier hashes
+        if not hmac.compare_digest(bytes(refresh_token.verifier_hash), hash_verifier(verifier, self.verifier_key)):
+            return None
+
+        return refresh_token
 
     def verify_access_token(self, token: str) -> Optional[Dict]:
         """Validate and decode access token"""
@@ -76,40 +142,60 @@ class JWTService:
 
     def verify_refresh_token(self, token: str, db: Session) -> Optional[Dict]:
         """Validate refresh token against database"""
-        token_hash = hash_token(token)
+        # Tokens the filter knows are not live (garbage, expired, revoked
+        # before the last rebuild) are rejected without a query
+        if not refresh_token_filter.might_be_live(token):
+            return None
 
-        # Find token in database
-        refresh_token = db.query(RefreshToken).filter(
-            RefreshToken.token_hash == token_hash,
-            RefreshToken.revoked == False
-        ).first()
+        # Read on the primary, never a replica: a lagging replica still shows
+        # a token revoked or rotated moments ago as live
+        refresh_token = self._find_refresh_token(token, db, live_only=True)
 
         if not refresh_token:
             return None
 
         # Check if token is expired
-        if datetime.utcnow() > refresh_token.expires_at:
+        if datetime.now(timezone.utc) > _as_utc(refresh_token.expires_at):
             return None
 
         return {
             "sub": str(refresh_token.user_id),
-            "token_id": str(refresh_token.id)
+            "token_id": str(refresh_token.id),
+            "expires_at": refresh_token.expires_at
         }
 
-    def revoke_refresh_token(self, token: str, db: Session) -> bool:
-        """Revoke refresh token"""
-        token_hash = hash_token(token)
+    def should_rotate_refresh_token(self, payload: Dict) -> bool:
+        """Check if a verified refresh token is old enough to be rotated"""
+        if self.refresh_rotation_threshold <= 0:
+            return True
+
+        lifetime = timedelta(days=self.refresh_token_expire_days)
+        remaining = _as_utc(payload["expires_at"]) - datetime.now(timezone.utc)
+        age = lifetime - remaining
+
+        return age >= lifetime * self.refresh_rotation_threshold
 
-        refresh_token = db.query(RefreshToken).filter(
-            RefreshToken.token_hash == token_hash
-        ).first()
+    def revoke_refresh_token(self, token: str, db: Session, revoke_upstream: bool = False) -> Optional[RefreshToken]:
+        """
+        Revoke refresh token, returning the revoked row (None if it was not live).
+        With revoke_upstream, the session's IdP refresh token is queued for
+        revocation in the same transaction.
+        """
+        refresh_token = self._find_refresh_token(token, db, live_only=True)
 
         if refresh_token:
             refresh_token.revoked = True
+            if revoke_upstream and refresh_token.upstream_refresh_token:
+                self.revocation_service.enqueue(
+                    refresh_token.upstream_provider,
+                    refresh_token.upstream_refresh_token,
+                    db
+                )
+                refresh_token.upstream_refresh_token = None
             db.commit()
-            return True
+            return refresh_token
 
-        return False
+        return None
 
     def revoke_all_user_tokens(self, user_id: str, db: Session) -> None:
         """Revoke all refresh tokens for a user"""
@@ -119,10 +205,23 @@ class JWTService:
         db.commit()
 
     def rotate_refresh_token(self, old_token: str, user_id: str, db: Session) -> Optional[str]:
-        """Revoke old refresh token and create new one"""
-        # Revoke old token
-        if not self.revoke_refresh_token(old_token, db):
+        """Revoke old refresh token and create new one, in one transaction"""
+        old_record = self._find_refresh_token(old_token, db, live_only=True)
+        if not old_record:
             return None
 
-        # Create new token
-        return self.create_refresh_token(user_id, db)
+        # The IdP session moves to the new token; the revoked row keeps no copy
+        upstream_provider = old_record.upstream_provider
+        upstream_refresh_token = old_record.upstream_refresh_token
+        old_record.revoked = True
+        old_record.upstream_refresh_token = None
+
+        # Committed together with the revocation above
+        new_token = self.create_refresh_token(
+            user_id,
+            db,
+            upstream_provider=upstream_provider,
+            upstream_refresh_token=upstream_refresh_token
+        )
+        metrics.increment("refresh_token.rotation.performed")
+        return new_token
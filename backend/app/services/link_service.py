@@ -1,37 +1,54 @@
 from typing import Optional
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
+from app.database import read_only
 from app.models.user import User
 from app.models.linked_identity import LinkedIdentity
+from app.services.revocation_service import revocation_service
+from app.services.user_service import LINKED_IDENTITIES_BY_USER_ID, UserService
+from app.utils.email import normalize_email
 import uuid
 
+# Built once per process so each call reuses the cached compiled statement
+_LINKED_IDENTITY_BY_IDENTITY = select(LinkedIdentity).where(
+    LinkedIdentity.identity_provider == bindparam("provider"),
+    LinkedIdentity.identity_id == bindparam("identity_id")
+).limit(1)
+
 
 class LinkService:
     """Service for account linking operations"""
 
+    def __init__(self):
+        self.user_service = UserService()
+        self.revocation_service = revocation_service
+
     def can_link_identities(
         self,
         user_id: str,
         provider: str,
         identity_id: str,
         email: str,
-        db: Session
+        db: Session,
+        user: Optional[User] = None
     ) -> tuple[bool, Optional[str]]:
         """
         Validate if identity can be linked
         Returns (can_link, error_message)
         """
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        if user is None:
+            user = self.user_service.get_user_by_id(user_id, db, use_replica=False)
         if not user:
             return False, "User not found"
 
         # Email must match (case-insensitive)
-        if user.email.lower() != email.lower():
+        if normalize_email(user.email) != normalize_email(email):
             return False, "Email addresses do not match"
 
         # Check if this identity is already linked
-        existing_link = db.query(LinkedIdentity).filter(
-            LinkedIdentity.identity_provider == provider,
-            LinkedIdentity.identity_id == identity_id
+        existing_link = db.scalars(
+            _LINKED_IDENTITY_BY_IDENTITY,
+            {"provider": provider, "identity_id": identity_id}
         ).first()
 
         if existing_link:
@@ -52,10 +69,18 @@ class LinkService:
         provider: str,
         identity_id: str,
         email: str,
-        db: Session
+        db: Session,
+        user: Optional[User] = None,
+        upstream_refresh_token: Optional[str] = None
     ) -> Optional[LinkedIdentity]:
-        """Link identity to user account"""
-        can_link, error = self.can_link_identities(user_id, provider, identity_id, email, db)
+        """Link identity to user account (upstream_refresh_token is the sealed IdP token)"""
+        # Load the user once, with the identities the profile document needs
+        if user is None:
+            user = self.user_service.get_user_by_id(
+                user_id, db, load_identities=True, use_replica=False
+            )
+
+        can_link, error = self.can_link_identities(user_id, provider, identity_id, email, db, user=user)
         if not can_link:
             raise ValueError(error)
 
@@ -63,17 +88,29 @@ class LinkService:
             user_id=uuid.UUID(user_id),
             identity_provider=provider,
             identity_id=identity_id,
-            provider_email=email.lower()
+            provider_email=normalize_email(email),
+            upstream_refresh_token=upstream_refresh_token
         )
 
-        db.add(linked_identity)
+        user.linked_identities.append(linked_identity)
+        user.bump_profile_version()
+        self.user_service.refresh_profile_document(user, db)
         db.commit()
         db.refresh(linked_identity)
         return linked_identity
 
-    def unlink_identity(self, user_id: str, provider: str, db: Session) -> bool:
+    def unlink_identity(
+        self,
+        user_id: str,
+        provider: str,
+        db: Session,
+        user: Optional[User] = None
+    ) -> bool:
         """Unlink identity from user account"""
-        user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+        if user is None:
+            user = self.user_service.get_user_by_id(
+                user_id, db, load_identities=True, use_replica=False
+            )
         if not user:
             return False
 
@@ -81,14 +118,21 @@ class LinkService:
         if user.primary_identity_provider == provider:
             raise ValueError("Cannot unlink primary identity provider")
 
-        # Find and delete linked identity
-        linked_identity = db.query(LinkedIdentity).filter(
-            LinkedIdentity.user_id == uuid.UUID(user_id),
-            LinkedIdentity.identity_provider == provider
-        ).first()
+        # Find linked identity in the (eager-loaded) collection
+        linked_identity = next(
+            (li for li in user.linked_identities if li.identity_provider == provider),
+            None
+        )
 
         if linked_identity:
-            db.delete(linked_identity)
+            # Revoke the identity's IdP token in the background, atomically with the unlink
+            if linked_identity.upstream_refresh_token:
+                self.revocation_service.enqueue(provider, linked_identity.upstream_refresh_token, db)
+
+            # delete-orphan cascade deletes the row on flush
+            user.linked_identities.remove(linked_identity)
+            user.bump_profile_version()
+            self.user_service.refresh_profile_document(user, db)
             db.commit()
             return True
 
@@ -96,6 +140,7 @@ class LinkService:
 
     def get_linked_identities(self, user_id: str, db: Session) -> list:
         """Get all linked identities for a user"""
-        return db.query(LinkedIdentity).filter(
-            LinkedIdentity.user_id == uuid.UUID(user_id)
-        ).all()
+        return read_only(
+            db,
+            lambda session: session.scalars(LINKED_IDENTITIES_BY_USER_ID, {"user_id": uuid.UUID(user_id)}).all()
+        )
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.auth0_service import Auth0Service
+from app.services.cognito_service import CognitoService
+from app.services.oidc_service import DiscoveryCache, OIDCProviderService, ProviderConfig
+from app.utils.metrics import metrics
+
+PROVIDER_TYPES = {
+    "cognito": CognitoService,
+    "auth0": Auth0Service,
+    "oidc": OIDCProviderService
+}
+
+# Pre-connected at startup; every other tenant is connected on first use
+DEFAULT_PROVIDERS = ["cognito", "auth0"]
+
+
+class ProviderUnavailableError(Exception):
+    """A registered provider whose endpoints could not be discovered"""
+
+
+def load_provider_configs(tenants_file: Optional[str]) -> List[ProviderConfig]:
+    """The COGNITO_*/AUTH0_RESEARCH_* providers plus any tenants from the JSON file"""
+    configs = [CognitoService.default_config(), Auth0Service.default_config()]
+
+    if tenants_file:
+        with open(tenants_file) as source:
+            # Tenants with a default provider's name replace it
+            configs.extend(ProviderConfig(**tenant) for tenant in json.load(source))
+
+    for config in configs:
+        if config.type not in PROVIDER_TYPES:
+            raise ValueError(f"Unknown provider type {config.type!r} for {config.name}")
+
+    return configs
+
+
+class ProviderRegistry:
+    """
+    Provider configs by name, with an LRU-bounded set of live clients.
+    Configs are cheap and all kept; a client (HTTP pool, key set, discovery
+    metadata) exists only while its tenant is in use and is closed once it is
+    least recently used beyond max_clients or idle for idle_seconds. An
+    evicted client finishes the requests it has in flight before its
+    connections close.
+    """
+
+    def __init__(self, configs: List[ProviderConfig], max_clients: int, idle_seconds: float, discovery_ttl: float):
+        self.configs: Dict[str, ProviderConfig] = {config.name: config for config in configs}
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.discovery = DiscoveryCache(discovery_ttl)
+        self._clients: "OrderedDict[str, OIDCProviderService]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+
+    def has(self, name: str) -> bool:
+        return name in self.configs
+
+    async def get(self, name: str) -> Optional[OIDCProviderService]:
+        """
+        Live client for a provider, or None if it is not registered.
+        Raises ProviderUnavailableError when its endpoints are unknown.
+        """
+        config = self.configs.get(name)
+        if config is None:
+            return None
+
+        now = time.monotonic()
+        client = self._clients.get(name)
+        if client is None:
+            client = PROVIDER_TYPES[config.type](config)
+            self._clients[name] = client
+            metrics.increment("providers.clients.created")
+
+        self._clients.move_to_end(name)
+        self._last_used[name] = now
+        await self._evict(now)
+        metrics.set_gauge("providers.clients.live", len(self._clients))
+
+        if not await client.discover(self.discovery, now):
+            raise ProviderUnavailableError(f"Identity provider {name} is unavailable")
+
+        return client
+
+    async def _evict(self, now: float) -> None:
+        # Least recently used first: stop at the first client that may stay
+        while self._clients:
+            name, client = next(iter(self._clients.items()))
+            if len(self._clients) <= self.max_clients and now - self._last_used[name] < self.idle_seconds:
+                break
+
+            del self._clients[name]
+            del self._last_used[name]
+            await client.close()
+            metrics.increment("providers.clients.evicted")
+
+    async def evict_idle(self) -> None:
+        """Close clients idle for longer than idle_seconds"""
+        await self._evict(time.monotonic())
+        metrics.set_gauge("providers.clients.live", len(self._clients))
+
+    async def close(self) -> None:
+        """Close every live client"""
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        self._last_used.clear()
+
+
+provider_registry = ProviderRegistry(
+    load_provider_configs(settings.PROVIDER_TENANTS_FILE),
+    max_clients=settings.PROVIDER_CLIENT_CACHE_SIZE,
+    idle_seconds=settings.PROVIDER_CLIENT_IDLE_SECONDS,
+    discovery_ttl=settings.OIDC_DISCOVERY_TTL_SECONDS
+)
+
+
+async def start_providers() -> None:
+    """Pre-connect the default providers and prefetch their signing keys"""
+    for name in DEFAULT_PROVIDERS:
+        try:
+            provider = await provider_registry.get(name)
+        except ProviderUnavailableError as e:
+            print(f"Error starting provider: {e}")
+            continue
+
+        if provider is not None:
+            await provider.start()
+
+
+async def stop_providers() -> None:
+    """Close every provider's pooled connections"""
+    await provider_registry.close()
+
+
+async def evict_idle_providers_periodically() -> None:
+    """Release idle tenants' connections and key sets even when no requests arrive"""
+    while True:
+        await asyncio.sleep(settings.PROVIDER_CLIENT_IDLE_SECONDS / 2)
+        await provider_registry.evict_idle()
@@ -0,0 +1,212 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idp_revocation import IdpRevocation
+from app.services.providers import ProviderUnavailableError, provider_registry
+from app.utils.metrics import metrics
+from app.utils.security import decrypt_secret, derive_encryption_key, encrypt_secret
+
+# A claimed row is hidden from other workers this long; if the worker dies
+# mid-delivery the row becomes due again afterwards
+CLAIM_LEASE_SECONDS = 60
+
+_PENDING = IdpRevocation.failed_at.is_(None)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class RevocationService:
+    """Durable queue of upstream (IdP) refresh token revocations"""
+
+    def __init__(self):
+        self.encryption_key = derive_encryption_key(
+            settings.IDP_TOKEN_ENCRYPTION_KEY or settings.JWT_SECRET_KEY,
+            "idp-token-encryption"
+        )
+        self.max_attempts = settings.IDP_REVOCATION_MAX_ATTEMPTS
+        self.backoff_seconds = settings.IDP_REVOCATION_BACKOFF_SECONDS
+        self.max_backoff_seconds = settings.IDP_REVOCATION_MAX_BACKOFF_SECONDS
+
+    def seal(self, token: Optional[str]) -> Optional[str]:
+        """Encrypt an upstream refresh token for storage"""
+        if not token:
+            return None
+        return encrypt_secret(token, self.encryption_key)
+
+    def enqueue(self, provider: str, sealed_token: str, db: Session) -> None:
+        """Queue a revocation in the caller's transaction (committed with it)"""
+        db.add(IdpRevocation(provider=provider, token=sealed_token, next_attempt_at=_utcnow()))
+        metrics.increment("idp_revocations.enqueued")
+
+    def claim(self, limit: int, db: Session) -> List[Tuple[str, str, str]]:
+        """
+        Lease up to limit due revocations, returning (id, provider, token).
+        SKIP LOCKED lets several workers and processes claim disjoint rows.
+        Tokens that cannot be decrypted can never be delivered and are parked.
+        """
+        now = _utcnow()
+        rows = db.scalars(
+            select(IdpRevocation)
+            .where(_PENDING, IdpRevocation.next_attempt_at <= now)
+            .order_by(IdpRevocation.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        claimed = []
+        for row in rows:
+            row.attempts += 1
+            token = decrypt_secret(row.token, self.encryption_key)
+            if token is None:
+                row.last_error = "token cannot be decrypted"
+                row.failed_at = now
+                metrics.increment("idp_revocations.failed")
+                continue
+
+            row.next_attempt_at = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+            claimed.append((row.id, row.provider, token))
+
+        db.commit()
+        return claimed
+
+    def complete(self, revocation_ids: List, db: Session) -> None:
+        """Remove delivered revocations"""
+        if revocation_ids:
+            db.execute(delete(IdpRevocation).where(IdpRevocation.id.in_(revocation_ids)))
+            db.commit()
+        metrics.increment("idp_revocations.delivered", len(revocation_ids))
+
+    def reschedule(self, failures: Dict, db: Session) -> None:
+        """Back off failed revocations, or park them once attempts are exhausted"""
+        now = _utcnow()
+        for revocation_id, error in failures.items():
+            row = db.get(IdpRevocation, revocation_id)
+            if row is None:
+                continue
+
+            row.last_error = error[:500]
+            if row.attempts >= self.max_attempts:
+                row.failed_at = now
+                metrics.increment("idp_revocations.failed")
+            else:
+                # Exponential backoff with full jitter
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (row.attempts - 1))
+                row.next_attempt_at = now + timedelta(seconds=random.uniform(0, delay))
+                metrics.increment("idp_revocations.retried")
+        db.commit()
+
+    def update_metrics(self, db: Session) -> None:
+        """Publish queue depth, lag (age of the oldest pending item) and parked items"""
+        depth, oldest, failed = db.execute(
+            select(
+                func.count().filter(_PENDING),
+                func.min(IdpRevocation.created_at).filter(_PENDING),
+                func.count().filter(IdpRevocation.failed_at.is_not(None))
+            )
+        ).one()
+
+        lag = 0.0
+        if oldest is not None:
+            if oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=timezone.utc)
+            lag = max(0.0, (_utcnow() - oldest).total_seconds())
+
+        metrics.set_gauge("idp_revocations.depth", depth)
+        metrics.set_gauge("idp_revocations.lag_seconds", lag)
+        metrics.set_gauge("idp_revocations.failed", failed)
+
+
+class RevocationWorker:
+    """Background pool delivering queued revocations to the providers"""
+
+    def __init__(self, revocation_service: RevocationService, concurrency: int, poll_seconds: float):
+        self.revocation_service = revocation_service
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        """Deliver new revocations now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _with_session(self, operation, *args):
+        db = SessionLocal()
+        try:
+            return operation(*args, db)
+        finally:
+            db.close()
+
+    async def _deliver(self, provider: str, token: str) -> Optional[str]:
+        """Revoke one token, returning an error message on failure"""
+        try:
+            provider_service = await provider_registry.get(provider)
+        except ProviderUnavailableError as e:
+            return str(e)
+
+        if provider_service is None:
+            return f"unknown provider {provider}"
+        if not await provider_service.revoke_token(token):
+            return "revocation request failed"
+        return None
+
+    async def run_once(self) -> int:
+        """Claim one batch and deliver it with bounded concurrency"""
+        service = self.revocation_service
+        claimed = await run_in_threadpool(self._with_session, service.claim, self.concurrency * 4)
+        if not claimed:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(provider: str, token: str) -> Optional[str]:
+            async with semaphore:
+                return await self._deliver(provider, token)
+
+        errors = await asyncio.gather(*(deliver(provider, token) for _, provider, token in claimed))
+
+        delivered = [revocation_id for (revocation_id, _, _), error in zip(claimed, errors) if error is None]
+        failures = {
+            revocation_id: error
+            for (revocation_id, _, _), error in zip(claimed, errors) if error is not None
+        }
+        await run_in_threadpool(self._with_session, service.complete, delivered)
+        if failures:
+            await run_in_threadpool(self._with_session, service.reschedule, failures)
+        return len(claimed)
+
+    async def run(self) -> None:
+        """Drain the queue until cancelled, sleeping between empty polls"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self.run_once()
+                await run_in_threadpool(self._with_session, self.revocation_service.update_metrics)
+            except Exception as e:
+                print(f"Error processing IdP revocations: {e}")
+                processed = 0
+
+            if processed:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+revocation_service = RevocationService()
+revocation_worker = RevocationWorker(
+    revocation_service,
+    concurrency=settings.IDP_REVOCATION_WORKERS,
+    poll_seconds=settings.IDP_REVOCATION_POLL_SECONDS
+)
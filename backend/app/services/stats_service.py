@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, read_only
+from app.models.auth_stat import AuthStatHourly
+from app.services.event_service import auth_events
+from app.utils.metrics import metrics
+
+# Event type -> rollup metric counted for every such event
+EVENT_METRICS = {
+    "login": "logins",
+    "signup": "signups",
+    "login_failed": "login_failures",
+    "refresh": "refreshes",
+    "refresh_failed": "refresh_failures",
+    "logout": "logouts",
+    "link": "links",
+    "link_failed": "link_failures",
+    "unlink": "unlinks",
+}
+
+_INSERT_BY_DIALECT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Start of the UTC hour containing moment"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class AuthStats:
+    """
+    Login, session and linking counters kept per process and merged into
+    hourly rollups, so dashboards read O(buckets) rows instead of counting
+    users or refresh_tokens.
+
+    Active sessions are derived without scanning refresh_tokens: each
+    refresh token adds sessions.opened to the hour it was issued, and
+    revoking it (logout, rotation) adds sessions.closed to that same hour.
+    Live sessions are then opened - closed over the hours still inside the
+    refresh token lifetime; expired sessions fall out of the window.
+    """
+
+    def __init__(self, flush_seconds: float, session_lifetime: timedelta):
+        self.flush_seconds = flush_seconds
+        self.session_lifetime = session_lifetime
+        self._pending: Dict[Tuple[datetime, str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _add(self, bucket: datetime, metric: str, provider: str = "", value: int = 1) -> None:
+        with self._lock:
+            self._pending[(bucket, metric, provider or "")] += value
+
+    def record(self, event: Dict) -> None:
+        """Auth event subscriber"""
+        metric = EVENT_METRICS.get(event["event_type"])
+        if metric is None:
+            return
+
+        now_bucket = hour_bucket(event["occurred_at"])
+        self._add(now_bucket, metric, event["provider"])
+
+        detail = event["detail"] or {}
+        event_type = event["event_type"]
+        if event_type == "login":
+            self._add(now_bucket, "sessions.opened")
+        elif event_type in ("logout", "refresh") and "session_expires_at" in detail:
+            if event_type == "refresh" and not detail.get("rotated"):
+                return
+            issued_at = datetime.fromisoformat(detail["session_expires_at"]) - self.session_lifetime
+            self._add(hour_bucket(issued_at), "sessions.closed")
+            if event_type == "refresh":
+                # Rotation continues the session with a newly issued token
+                self._add(now_bucket, "sessions.opened")
+
+    def flush(self, db: Session) -> int:
+        """Merge pending counters into the rollup table, returning the rows upserted"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return 0
+
+        rows = [
+            {"bucket": bucket, "metric": metric, "provider": provider, "value": value}
+            for (bucket, metric, provider), value in pending.items()
+        ]
+        insert = _INSERT_BY_DIALECT[db.get_bind().dialect.name]
+        statement = insert(AuthStatHourly)
+        statement = statement.on_conflict_do_update(
+            index_elements=["bucket", "metric", "provider"],
+            set_={"value": AuthStatHourly.value + statement.excluded.value}
+        )
+
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep the counts for the next flush
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+            raise
+
+        metrics.increment("auth_stats.rows_upserted", len(rows))
+        return len(rows)
+
+    async def run(self) -> None:
+        """Merge counters every flush_seconds until cancelled, then once more"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_seconds)
+                try:
+                    await run_in_threadpool(self._flush_with_session)
+                except Exception as e:
+                    print(f"Error flushing auth stats: {e}")
+        finally:
+            try:
+                self._flush_with_session()
+            except Exception as e:
+                print(f"Error flushing auth stats: {e}")
+
+    def _flush_with_session(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.flush(db)
+        finally:
+            db.close()
+
+    def summary(self, hours: int, db: Session) -> Dict:
+        """Hourly series for the last hours plus the live session count"""
+        now = datetime.now(timezone.utc)
+        since = hour_bucket(now) - timedelta(hours=hours - 1)
+        session_since = hour_bucket(now - self.session_lifetime)
+
+        rows = read_only(db, lambda session: session.execute(
+            select(AuthStatHourly.bucket, AuthStatHourly.metric, AuthStatHourly.provider, AuthStatHourly.value)
+            .where(AuthStatHourly.bucket >= min(since, session_since))
+            .order_by(AuthStatHourly.bucket)
+        ).all())
+
+        series: Dict[str, Dict] = {}
+        totals: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        active_sessions = 0
+        for bucket, metric, provider, value in rows:
+            bucket = hour_bucket(bucket)
+            if bucket >= session_since:
+                if metric == "sessions.opened":
+                    active_sessions += value
+                elif metric == "sessions.closed":
+                    active_sessions -= value
+            if bucket < since or metric.startswith("sessions."):
+                continue
+
+            key = provider or "all"
+            series.setdefault(bucket.isoformat(), {}).setdefault(metric, {})[key] = value
+            totals[metric][key] += value
+
+        return {
+            "since": since.isoformat(),
+            "active_sessions": max(0, active_sessions),
+            "totals": {metric: dict(by_provider) for metric, by_provider in totals.items()},
+            "hourly": series
+        }
+
+
+# Global stats aggregator, fed by the auth event log
+auth_stats = AuthStats(
+    flush_seconds=settings.AUTH_STATS_FLUSH_SECONDS,
+    session_lifetime=timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+)
+auth_events.subscribe(auth_stats.record)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.refresh_token import RefreshToken
+from app.utils.bloom import BloomFilter
+from app.utils.metrics import metrics
+from app.utils.security import hash_token, split_selector_token, uuid7_timestamp
+
+# Selector timestamps come from the issuing host's clock, and the row is
+# committed a little after its selector was generated. Tokens issued this
+# close to a snapshot are treated as newer than it
+CLOCK_SKEW_SECONDS = 60
+BUILD_BATCH_SIZE = 10000
+
+_LIVE = (RefreshToken.revoked == False, RefreshToken.expires_at > bindparam("now"))
+_LIVE_TOKEN_COUNT = select(func.count()).select_from(RefreshToken).where(*_LIVE)
+_LIVE_TOKEN_KEYS = select(RefreshToken.id, RefreshToken.token_hash).where(*_LIVE)
+
+
+class RefreshTokenFilter:
+    """
+    Bloom filter of the refresh tokens that were live at the last rebuild,
+    answering "certainly not live" for a presented token without a query.
+
+    Selectors are UUIDv7, so every token carries its issue time. Tokens
+    issued after the snapshot (less CLOCK_SKEW_SECONDS) are not in the filter
+    and always go to the database; this keeps the filter correct while any
+    number of processes issue tokens, without updating it on create or
+    rotate. A Bloom filter cannot delete, so a revoked token keeps passing
+    until the next rebuild and is rejected by the database as before.
+    Selectors dated in the future or beyond the token lifetime are rejected
+    outright.
+    """
+
+    def __init__(self, enabled: bool, rebuild_seconds: float, false_positive_rate: float, token_lifetime: timedelta):
+        self.enabled = enabled
+        self.rebuild_seconds = rebuild_seconds
+        self.false_positive_rate = false_positive_rate
+        self.token_lifetime = token_lifetime.total_seconds()
+        # (filter, Unix time from which issued tokens bypass it), replaced as a whole
+        self._snapshot: Optional[Tuple[BloomFilter, float]] = None
+
+    def might_be_live(self, token: str) -> bool:
+        """False only for tokens that are certainly not live; True means ask the database"""
+        if not self.enabled:
+            return True
+
+        parsed = split_selector_token(token)
+        if parsed is None:
+            # Legacy tokens are keyed by their hash, and are never issued any more
+            key, issued_at = hash_token(token).encode(), None
+        else:
+            key, issued_at = parsed[0].bytes, uuid7_timestamp(parsed[0])
+
+        snapshot = self._snapshot
+        if issued_at is not None:
+            now = time.time()
+            if issued_at > now + CLOCK_SKEW_SECONDS or issued_at < now - self.token_lifetime - CLOCK_SKEW_SECONDS:
+                metrics.increment("refresh_token.filter.rejected")
+                return False
+            if snapshot is None or issued_at >= snapshot[1]:
+                metrics.increment("refresh_token.filter.bypassed")
+                return True
+
+        if snapshot is None:
+            return True
+        if key in snapshot[0]:
+            metrics.increment("refresh_token.filter.passed")
+            return True
+        metrics.increment("refresh_token.filter.rejected")
+        return False
+
+    def rebuild(self, db: Session) -> int:
+        """Replace the filter with the tokens live now on the primary, returning their number"""
+        # Taken before reading, so tokens committed during the scan are newer than the snapshot
+        cutoff = time.time() - CLOCK_SKEW_SECONDS
+        params = {"now": datetime.now(timezone.utc)}
+        live = db.scalar(_LIVE_TOKEN_COUNT, params)
+
+        bloom = BloomFilter(live, self.false_positive_rate)
+        rows = db.execute(_LIVE_TOKEN_KEYS, params, execution_options={"yield_per": BUILD_BATCH_SIZE})
+        for token_id, token_hash in rows:
+            bloom.add(token_hash.encode() if token_hash else token_id.bytes)
+
+        self._snapshot = (bloom, cutoff)
+        metrics.set_gauge("refresh_token.filter.tokens", bloom.count)
+        metrics.set_gauge("refresh_token.filter.bytes", bloom.memory_bytes)
+        return bloom.count
+
+    def _rebuild_with_session(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.rebuild(db)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """Build the filter, then rebuild it every rebuild_seconds until cancelled"""
+        while True:
+            try:
+                await run_in_threadpool(self._rebuild_with_session)
+            except Exception as e:
+                print(f"Error rebuilding refresh token filter: {e}")
+            await asyncio.sleep(self.rebuild_seconds)
+
+
+# Global refresh token filter (built by the lifespan task when enabled)
+refresh_token_filter = RefreshTokenFilter(
+    enabled=settings.REFRESH_TOKEN_FILTER,
+    rebuild_seconds=settings.REFRESH_TOKEN_FILTER_REBUILD_SECONDS,
+    false_positive_rate=settings.REFRESH_TOKEN_FILTER_FALSE_POSITIVE_RATE,
+    token_lifetime=timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+)
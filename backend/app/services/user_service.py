@@ -1,43 +1,118 @@
-from typing import Optional
-from datetime import datetime
-from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, inspect, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, selectinload
+from app.config import settings
+from app.database import read_only
 from app.models.user import User
 from app.models.linked_identity import LinkedIdentity
+from app.utils.email import normalize_email
+import threading
 import uuid
 
 
+# Hot-path statements are built once per process with bind parameters, so
+# every call reuses the same cache key and compiled form
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id")).limit(1)
+_USER_WITH_IDENTITIES_BY_ID = _USER_BY_ID.options(selectinload(User.linked_identities))
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+_USER_BY_PRIMARY_IDENTITY = select(User).where(
+    User.primary_identity_provider == bindparam("provider"),
+    User.primary_identity_id == bindparam("identity_id")
+).limit(1)
+_USER_BY_LINKED_IDENTITY = select(User).join(User.linked_identities).where(
+    LinkedIdentity.identity_provider == bindparam("provider"),
+    LinkedIdentity.identity_id == bindparam("identity_id")
+).limit(1)
+_PROFILE_BY_USER_ID = select(User.profile_version, User.profile_document).where(
+    User.id == bindparam("user_id")
+)
+# Shared with LinkService, so the profile and the link list order identities alike
+LINKED_IDENTITIES_BY_USER_ID = select(LinkedIdentity).where(
+    LinkedIdentity.user_id == bindparam("user_id")
+).order_by(LinkedIdentity.linked_at)
+# Core statement on the table: rows come back as plain tuples, no ORM loading
+_users = User.__table__
+_PRINCIPAL_BY_ID = select(_users.c.id, _users.c.email, _users.c.profile_version).where(
+    _users.c.id == bindparam("user_id")
+)
+
+
+class Principal(NamedTuple):
+    """Authenticated caller: the user columns the auth dependencies need, immutable"""
+    user_id: str
+    email: str
+    profile_version: int
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Render timestamps the same way whether or not they came from the database"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
 class UserService:
     """Service for user operations"""
 
-    def get_user_by_id(self, user_id: str, db: Session) -> Optional[User]:
-        """Get user by ID"""
-        return db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+    def __init__(self):
+        # In-memory mirror of stored profile documents keyed by user id,
+        # each entry tagged with the profile_version it was read at
+        self.profile_cache_size = settings.PROFILE_CACHE_SIZE
+        self._profile_cache: OrderedDict = OrderedDict()
+        self._profile_cache_lock = threading.Lock()
+
+    def get_user_by_id(
+        self,
+        user_id: str,
+        db: Session,
+        load_identities: bool = False,
+        use_replica: bool = True
+    ) -> Optional[User]:
+        """
+        Get user by ID, optionally eager-loading linked identities.
+        Pass use_replica=False when the user is about to be modified.
+        """
+        statement = _USER_WITH_IDENTITIES_BY_ID if load_identities else _USER_BY_ID
+        params = {"user_id": uuid.UUID(user_id)}
+
+        def query(session: Session) -> Optional[User]:
+            return session.scalars(statement, params).first()
+
+        if not use_replica:
+            return query(db)
+        return read_only(db, query)
+
+    def get_principal(self, user_id: str, db: Session) -> Optional[Principal]:
+        """
+        Principal for a user id, or None if the user does not exist.
+        Runs on the session's connection, bypassing the ORM identity map.
+        """
+        params = {"user_id": uuid.UUID(user_id)}
+        row = read_only(db, lambda session: session.connection().execute(_PRINCIPAL_BY_ID, params).first())
+        if row is None:
+            return None
+        return Principal(user_id, row[1], row[2])
 
     def get_user_by_email(self, email: str, db: Session) -> Optional[User]:
         """Get user by email"""
-        return db.query(User).filter(User.email == email.lower()).first()
+        return db.scalars(_USER_BY_EMAIL, {"email": normalize_email(email)}).first()
 
     def get_user_by_identity(self, provider: str, identity_id: str, db: Session) -> Optional[User]:
         """Get user by identity provider and identity ID"""
-        # Check primary identity
-        user = db.query(User).filter(
-            User.primary_identity_provider == provider,
-            User.primary_identity_id == identity_id
-        ).first()
+        params = {"provider": provider, "identity_id": identity_id}
 
+        # Check primary identity
+        user = db.scalars(_USER_BY_PRIMARY_IDENTITY, params).first()
         if user:
             return user
 
-        # Check linked identities
-        linked_identity = db.query(LinkedIdentity).filter(
-            LinkedIdentity.identity_provider == provider,
-            LinkedIdentity.identity_id == identity_id
-        ).first()
-
-        if linked_identity:
-            return linked_identity.user
-
-        return None
+        # Check linked identities (joined, so the owner comes back in one query)
+        return db.scalars(_USER_BY_LINKED_IDENTITY, params).first()
 
     def create_user(
         self,
@@ -49,7 +124,7 @@ class UserService:
     ) -> User:
         """Create new user"""
         user = User(
-            email=email.lower(),
+            email=normalize_email(email),
             email_verified=email_verified,
             primary_identity_provider=provider,
             primary_identity_id=identity_id,
@@ -57,40 +132,119 @@ class UserService:
         )
 
         db.add(user)
+        db.flush()  # assigns id and created_at (Python-side defaults, no reload)
+        user.profile_document = self.build_profile_document(user, [])
         db.commit()
         db.refresh(user)
         return user
 
-    def update_last_login(self, user_id: str, db: Session) -> None:
+    def update_last_login(self, user_id: str, db: Session, user: Optional[User] = None) -> None:
         """Update user's last login timestamp"""
-        user = self.get_user_by_id(user_id, db)
+        if user is None:
+            user = self.get_user_by_id(user_id, db, use_replica=False)
         if user:
             user.last_login_at = datetime.utcnow()
+            user.bump_profile_version()
+            self.refresh_profile_document(user, db)
             db.commit()
 
-    def get_user_profile(self, user_id: str, db: Session) -> Optional[dict]:
-        """Get user profile with linked identities"""
-        user = self.get_user_by_id(user_id, db)
-        if not user:
-            return None
-
-        linked_identities = db.query(LinkedIdentity).filter(
-            LinkedIdentity.user_id == uuid.UUID(user_id)
-        ).all()
-
+    def build_profile_document(self, user: User, linked_identities: list) -> dict:
+        """Build the profile document served by /user/profile"""
         return {
             "id": str(user.id),
             "email": user.email,
             "email_verified": user.email_verified,
             "primary_provider": user.primary_identity_provider,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
-            "last_login_at": user.last_login_at.isoformat() if user.last_login_at else None,
+            "created_at": _isoformat(user.created_at),
+            "last_login_at": _isoformat(user.last_login_at),
             "linked_identities": [
                 {
                     "provider": li.identity_provider,
                     "email": li.provider_email,
-                    "linked_at": li.linked_at.isoformat() if li.linked_at else None
+                    "linked_at": _isoformat(li.linked_at)
                 }
                 for li in linked_identities
             ]
         }
+
+    def refresh_profile_document(self, user: User, db: Session) -> None:
+        """Recompute the stored profile document inside the caller's transaction"""
+        db.flush()
+        if "linked_identities" in inspect(user).unloaded:
+            linked_identities = db.scalars(
+                LINKED_IDENTITIES_BY_USER_ID, {"user_id": user.id}
+            ).all()
+        else:
+            # Reuse the collection the caller already loaded and kept current
+            linked_identities = sorted(
+                user.linked_identities,
+                key=lambda li: li.linked_at.timestamp() if li.linked_at else 0
+            )
+
+        user.profile_document = self.build_profile_document(user, linked_identities)
+
+    def get_user_profile(
+        self,
+        user_id: str,
+        db: Session,
+        profile_version: Optional[int] = None,
+        user: Optional[User] = None
+    ) -> Optional[dict]:
+        """Get user profile from the stored profile document"""
+        # The request already loaded the row that carries the document
+        if user is not None and user.profile_document is not None:
+            return user.profile_document
+
+        # Serve from memory when the caller already knows the current version
+        if profile_version is not None:
+            cached = self._get_cached_profile(user_id, profile_version)
+            if cached is not None:
+                return cached
+
+        row = self.get_profile_state(user_id, db)
+        if not row:
+            return None
+
+        document = row.profile_document
+        if document is None:
+            # Not backfilled yet; build from the normalized tables
+            return self._build_profile_from_tables(user_id, db)
+
+        self._cache_profile(user_id, row.profile_version, document)
+        return document
+
+    def get_profile_state(self, user_id: str, db: Session) -> Optional[Row]:
+        """(profile_version, profile_document) row for a user, or None, in one Core-row query"""
+        return read_only(
+            db,
+            lambda session: session.execute(_PROFILE_BY_USER_ID, {"user_id": uuid.UUID(user_id)}).first()
+        )
+
+    def _build_profile_from_tables(self, user_id: str, db: Session) -> Optional[dict]:
+        user = self.get_user_by_id(user_id, db)
+        if not user:
+            return None
+
+        linked_identities = read_only(
+            db,
+            lambda session: session.scalars(LINKED_IDENTITIES_BY_USER_ID, {"user_id": uuid.UUID(user_id)}).all()
+        )
+
+        return self.build_profile_document(user, linked_identities)
+
+    def _get_cached_profile(self, user_id: str, profile_version: int) -> Optional[dict]:
+        with self._profile_cache_lock:
+            entry = self._profile_cache.get(user_id)
+            if entry is None or entry[0] != profile_version:
+                return None
+            self._profile_cache.move_to_end(user_id)
+            return entry[1]
+
+    def _cache_profile(self, user_id: str, profile_version: int, document: dict) -> None:
+        if self.profile_cache_size <= 0:
+            return
+        with self._profile_cache_lock:
+            self._profile_cache[user_id] = (profile_version, document)
+            self._profile_cache.move_to_end(user_id)
+            while len(self._profile_cache) > self.profile_cache_size:
+                self._profile_cache.popitem(last=False)
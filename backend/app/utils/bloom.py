@@ -0,0 +1,38 @@
+import hashlib
+import math
+import os
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over byte strings: no false negatives, false
+    positives at about false_positive_rate once capacity items were added.
+    Positions come from a keyed BLAKE2b (random key per filter), so which
+    keys collide cannot be worked out from outside the process.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._key = os.urandom(16)
+
+    def _positions(self, item: bytes):
+        digest = hashlib.blake2b(item, digest_size=16, key=self._key).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: bytes) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
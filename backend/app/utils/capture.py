@@ -0,0 +1,167 @@
+import base64
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+import orjson
+from app.config import settings
+from app.services.event_service import auth_events
+from app.utils.sql_profiler import track_queries
+
+CAPTURED_PREFIXES = ("/api/v1/auth/", "/api/v1/link/", "/api/v1/user/")
+
+# Query parameters whose values are never recorded; replay supplies fresh ones
+PLACEHOLDERS = {"code": "<code>", "state": "<state>"}
+# Query parameters recorded as sent; every other value becomes "<value>"
+KEPT_PARAMS = {"limit"}
+
+_current_record: ContextVar[Optional[Dict]] = ContextVar("traffic_capture_record", default=None)
+
+
+def _token_subject(authorization: str) -> Optional[str]:
+    """Unverified sub claim of a bearer JWT (the route has verified it already)"""
+    try:
+        payload = authorization.split(" ", 1)[1].split(".")[1]
+        return orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))).get("sub")
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+class TrafficRecorder:
+    """
+    Sanitized request shapes and timings appended to an NDJSON file.
+
+    Each line holds the method, route template and path parameters (provider
+    names), which credentials were sent but never their values, a pseudonymous
+    user number, the auth events the request emitted, the status, the server
+    time in ms and the number of SQL statements executed. OAuth codes, states,
+    bearer tokens and refresh cookies are replaced by placeholders that
+    app.cli.replay_traffic fills with fresh values.
+    """
+
+    def __init__(self, path: str, sample_rate: float, max_requests: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_requests = max_requests
+        self._file = None
+        self._recorded = 0
+        self._users: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        auth_events.subscribe(self._record_event)
+
+    def wants(self, path: str) -> bool:
+        """Whether a request to path should be recorded"""
+        if not path.startswith(CAPTURED_PREFIXES) or self._recorded >= self.max_requests:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def begin(self, scope: Dict) -> Dict:
+        """Start a record for a request, before the application handles it"""
+        headers = {name: value for name, value in scope["headers"] if name in (b"authorization", b"cookie", b"if-none-match")}
+        credentials: List[str] = []
+        if b"authorization" in headers:
+            credentials.append("bearer")
+        if b"refresh_token=" in headers.get(b"cookie", b""):
+            credentials.append("refresh")
+        if b"if-none-match" in headers:
+            credentials.append("etag")
+
+        query = {
+            key: PLACEHOLDERS.get(key, value if key in KEPT_PARAMS else "<value>")
+            for key, value in parse_qsl(scope["query_string"].decode("latin-1"))
+        }
+
+        record = {"m": scope["method"], "q": query, "a": credentials, "e": [], "s": 500, "db": 0}
+        if b"authorization" in headers:
+            record["_sub"] = _token_subject(headers[b"authorization"].decode("latin-1"))
+        return record
+
+    def _pseudonym(self, user_id: str) -> int:
+        with self._lock:
+            return self._users.setdefault(user_id, len(self._users))
+
+    def _record_event(self, event: Dict) -> None:
+        """Auth event subscriber: attach events to the request that emitted them"""
+        record = _current_record.get()
+        if record is None:
+            return
+        record["e"].append(event["event_type"])
+        if event["user_id"] is not None and "u" not in record:
+            record["u"] = self._pseudonym(str(event["user_id"]))
+
+    def finish(self, record: Dict, scope: Dict, elapsed: float) -> None:
+        """Complete and write a record once the response has been sent"""
+        route = scope.get("route")
+        subject = record.pop("_sub", None)
+        if route is None:
+            # Unmatched paths are not part of the replayable mix
+            return
+
+        record["r"] = route.path_format
+        record["p"] = dict(scope.get("path_params") or {})
+        record["ms"] = round(elapsed * 1000, 3)
+        if subject and "u" not in record and record["s"] != 401:
+            record["u"] = self._pseudonym(subject)
+
+        line = orjson.dumps(record) + b"\n"
+        with self._lock:
+            if self._recorded >= self.max_requests:
+                return
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(line)
+            self._recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware timing captured requests and counting their SQL statements"""
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.wants(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        record = self.recorder.begin(scope)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                record["s"] = message["status"]
+            await send(message)
+
+        # Threadpool work copies the context, so events and statements from
+        # there land on the same record and query log
+        token = _current_record.set(record)
+        start = time.perf_counter()
+        try:
+            with track_queries() as queries:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_record.reset(token)
+            record["db"] = queries.count
+            self.recorder.finish(record, scope, elapsed)
+
+
+# Global recorder, when capture is enabled
+traffic_recorder = (
+    TrafficRecorder(
+        settings.TRAFFIC_CAPTURE_FILE,
+        sample_rate=settings.TRAFFIC_CAPTURE_SAMPLE_RATE,
+        max_requests=settings.TRAFFIC_CAPTURE_MAX_REQUESTS
+    )
+    if settings.TRAFFIC_CAPTURE_FILE
+    else None
+)
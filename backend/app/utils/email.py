@@ -0,0 +1,15 @@
+import re
+from typing import Optional
+
+# Deliberately loose: one "@", no whitespace, a dot in the domain
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def normalize_email(email: str) -> str:
+    """Normalize an email address the way it is stored and compared"""
+    return email.strip().lower()
+
+
+def is_valid_email(email: Optional[str]) -> bool:
+    """Check that a (normalized) email address is plausibly deliverable"""
+    return bool(email) and _EMAIL_PATTERN.match(email) is not None
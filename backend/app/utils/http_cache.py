@@ -0,0 +1,29 @@
+from typing import Optional
+
+# Bump when the profile JSON shape changes so old ETags stop matching
+PROFILE_REPRESENTATION = "p1"
+
+# Cached copies are per-user and must be revalidated on every use
+PROFILE_CACHE_CONTROL = "private, no-cache"
+
+
+def profile_etag(user_id: str, profile_version: int) -> str:
+    """Build the strong ETag for a user's profile"""
+    return f'"{PROFILE_REPRESENTATION}-{user_id}-{profile_version}"'
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, RFC 9110)"""
+    if not header:
+        return False
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
@@ -0,0 +1,192 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.routes import route_label
+
+STACK_DEPTH = 30
+
+
+class EventLoopBlockedError(RuntimeError):
+    """Raised in strict mode by a request that blocked the event loop past the threshold"""
+
+
+class Stall:
+    """One callback blocking the event loop, as seen by the watchdog"""
+
+    def __init__(self, started: float, route: str, stack: List[str]):
+        self.started = started
+        self.route = route
+        self.stack = stack
+        self.duration = 0.0
+        self.at = datetime.now(timezone.utc)
+
+    def as_dict(self) -> Dict:
+        return {
+            "route": self.route,
+            "duration_ms": round(self.duration * 1000, 1),
+            "at": self.at.isoformat(),
+            "stack": self.stack
+        }
+
+
+class LoopMonitor:
+    """
+    Event loop lag and blocking diagnostics.
+
+    A sampler task sleeps sample_seconds at a time and records how late it
+    wakes up (loop lag). A watchdog thread watches the sampler's heartbeat;
+    once the loop has been unresponsive for threshold_ms it captures the loop
+    thread's stack and the route of the task that is running, then accounts
+    the stall's full duration to that route when the loop recovers.
+    """
+
+    def __init__(self, sample_seconds: float, threshold_ms: float, strict: bool):
+        self.sample_seconds = sample_seconds
+        self.threshold = threshold_ms / 1000
+        self.strict = strict
+        self.recent: deque = deque(maxlen=20)
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._task_scopes: Dict[asyncio.Task, Dict] = {}
+        self._task_stalls: Dict[asyncio.Task, Stall] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._stall: Optional[Stall] = None
+        self._max_lag = 0.0
+
+    def enter(self, scope: Dict) -> Optional[asyncio.Task]:
+        """Attribute the current task to a request while it is being handled"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_scopes[task] = scope
+        return task
+
+    def exit(self, task: Optional[asyncio.Task]) -> Optional[Stall]:
+        """Stop attributing task, returning the stall it caused (if any)"""
+        if task is None:
+            return None
+        self._task_scopes.pop(task, None)
+        with self._lock:
+            stall = self._task_stalls.pop(task, None)
+        if stall is not None and stall.duration == 0.0:
+            # The handler finished before the loop got back to the sampler
+            stall.duration = time.monotonic() - stall.started
+        return stall
+
+    def _watch(self, stop: threading.Event) -> None:
+        check_seconds = max(self.threshold / 4, 0.005)
+        while not stop.wait(check_seconds):
+            overdue = time.monotonic() - self._heartbeat - self.sample_seconds
+            if overdue >= self.threshold:
+                if self._stall is None:
+                    self._begin_stall(self._heartbeat + self.sample_seconds)
+            elif self._stall is not None:
+                self._end_stall()
+
+    def _begin_stall(self, started: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=STACK_DEPTH) if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        scope = self._task_scopes.get(task) if task is not None else None
+        route = route_label(scope) if scope is not None else "(no request)"
+
+        self._stall = Stall(started, route, [line.rstrip() for line in stack])
+        if scope is not None:
+            with self._lock:
+                self._task_stalls[task] = self._stall
+
+    def _end_stall(self) -> None:
+        stall, self._stall = self._stall, None
+        if not stall.duration:
+            stall.duration = max(self._heartbeat - stall.started, self.threshold)
+
+        with self._lock:
+            totals = self._routes.setdefault(stall.route, {"stalls": 0, "blocked_ms": 0.0, "max_ms": 0.0})
+            totals["stalls"] += 1
+            totals["blocked_ms"] += stall.duration * 1000
+            totals["max_ms"] = max(totals["max_ms"], stall.duration * 1000)
+            self.recent.append(stall)
+
+        metrics.increment("event_loop.stalls")
+        metrics.increment("event_loop.blocked_ms", stall.duration * 1000)
+
+    async def run(self) -> None:
+        """Sample loop lag until cancelled, with the watchdog running alongside"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+
+        stop = threading.Event()
+        watchdog = threading.Thread(target=self._watch, args=(stop,), name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                expected = time.monotonic() + self.sample_seconds
+                await asyncio.sleep(self.sample_seconds)
+                now = time.monotonic()
+                self._heartbeat = now
+
+                lag = max(0.0, now - expected)
+                self._max_lag = max(self._max_lag, lag)
+                metrics.set_gauge("event_loop.lag_ms", round(lag * 1000, 3))
+                metrics.set_gauge("event_loop.lag_max_ms", round(self._max_lag * 1000, 3))
+        finally:
+            stop.set()
+            watchdog.join()
+
+    def report(self) -> Dict:
+        """Lag, blocking time per route and the most recent stalls with their stacks"""
+        with self._lock:
+            routes = {
+                route: {name: round(value, 1) for name, value in totals.items()}
+                for route, totals in self._routes.items()
+            }
+            recent = [stall.as_dict() for stall in reversed(self.recent)]
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "strict": self.strict,
+            "lag_max_ms": round(self._max_lag * 1000, 3),
+            "routes": routes,
+            "recent_stalls": recent
+        }
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware attributing event loop stalls to the route being handled"""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = self.monitor.enter(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stall = self.monitor.exit(task)
+
+        if stall is not None and self.monitor.strict:
+            raise EventLoopBlockedError(
+                f"{stall.route} blocked the event loop for {stall.duration * 1000:.0f} ms "
+                f"(threshold {self.monitor.threshold * 1000:.0f} ms):\n" + "\n".join(stall.stack)
+            )
+
+
+# Global event loop monitor
+loop_monitor = LoopMonitor(
+    sample_seconds=settings.EVENT_LOOP_SAMPLE_SECONDS,
+    threshold_ms=settings.EVENT_LOOP_BLOCK_THRESHOLD_MS,
+    strict=settings.EVENT_LOOP_STRICT
+)
@@ -0,0 +1,60 @@
+import math
+import time
+from http.cookies import SimpleCookie
+from typing import Optional
+from app.config import settings
+from app.database import request_writes
+
+# Unix time of the client's last write; short-lived, so it only exists
+# while the client's reads must stay on the primary
+LAST_WRITE_COOKIE = "last_write"
+
+
+def _cookie_wrote_at(scope) -> Optional[float]:
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(LAST_WRITE_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return None
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware carrying the read-your-writes window with the client, so
+    it holds whichever worker or instance serves the next request: a request
+    that wrote sets the last_write cookie for DB_READ_YOUR_WRITES_SECONDS,
+    and read_only() keeps the reads of requests presenting it on the primary.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_age = math.ceil(settings.DB_READ_YOUR_WRITES_SECONDS)
+        self.secure = settings.APP_ENV == "production"
+
+    def _set_cookie(self) -> bytes:
+        cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax"
+        if self.secure:
+            cookie += "; Secure"
+        return cookie.encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = {"wrote_at": _cookie_wrote_at(scope), "wrote": False}
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state["wrote"]:
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", self._set_cookie())]
+            await send(message)
+
+        token = request_writes.set(state)
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_writes.reset(token)
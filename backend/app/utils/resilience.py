@@ -0,0 +1,167 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict
+import httpx
+from app.utils.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised instead of calling a provider endpoint whose breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Opens after failure_threshold failures in a row, fails fast for
+    reset_seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._failures < self.failure_threshold:
+            return CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            now = time.monotonic()
+            # A trial that never reported back (e.g. cancelled) expires after reset_seconds
+            if state == HALF_OPEN and (
+                self._trial_started_at is None or now - self._trial_started_at >= self.reset_seconds
+            ):
+                self._trial_started_at = now
+                return True
+
+        metrics.increment(f"idp.{self.name}.breaker.rejected")
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_started_at = None
+            if self._failures >= self.failure_threshold:
+                # (Re)open: a failed half-open trial starts a new cool-down
+                self._opened_at = time.monotonic()
+                opened = True
+            else:
+                opened = False
+
+        if opened:
+            metrics.increment(f"idp.{self.name}.breaker.opened")
+
+
+# Every breaker by "provider.endpoint", for the metrics endpoint
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, failure_threshold: int, reset_seconds: float) -> CircuitBreaker:
+    """Breaker for one provider endpoint, created on first use"""
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name, failure_threshold, reset_seconds)
+    return breakers[name]
+
+
+def breaker_states() -> Dict[str, str]:
+    """Current state of every breaker"""
+    return {name: breaker.state for name, breaker in breakers.items()}
+
+
+def _is_provider_failure(response: httpx.Response) -> bool:
+    # 4xx means the provider is up and rejected the request; only these count against it
+    return response.status_code >= 500 or response.status_code == 429
+
+
+async def _hedged(send: Callable[[], Awaitable[httpx.Response]], hedge_delay: float, name: str) -> httpx.Response:
+    """Send, and send again if no answer arrives within hedge_delay; first success wins"""
+    first = asyncio.ensure_future(send())
+    done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+    if done:
+        return first.result()
+
+    metrics.increment(f"idp.{name}.hedged")
+    pending = {first, asyncio.ensure_future(send())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_resilience(
+    breaker: CircuitBreaker,
+    send: Callable[[], Awaitable[httpx.Response]],
+    idempotent: bool,
+    retries: int,
+    backoff_seconds: float,
+    hedge_delay: float
+) -> httpx.Response:
+    """
+    Run one provider call behind its circuit breaker.
+    Idempotent calls are retried on transport errors, 5xx and 429 with full
+    jitter backoff, and hedged when hedge_delay > 0. Others are sent once.
+    Raises httpx.HTTPError (CircuitOpenError when failing fast).
+    """
+    attempts = 1 + (retries if idempotent else 0)
+
+    for attempt in range(attempts):
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {breaker.name}")
+
+        try:
+            if idempotent and hedge_delay > 0:
+                response = await _hedged(send, hedge_delay, breaker.name)
+            else:
+                response = await send()
+        except httpx.TransportError:
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+        else:
+            if not _is_provider_failure(response):
+                breaker.record_success()
+                response.raise_for_status()
+                return response
+
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                response.raise_for_status()
+
+        metrics.increment(f"idp.{breaker.name}.retried")
+        await asyncio.sleep(random.uniform(0, backoff_seconds * 2 ** attempt))
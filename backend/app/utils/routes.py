@@ -0,0 +1,17 @@
+from typing import Dict
+
+# Label for requests no route handled (404, or 405 for a method the route lacks)
+UNMATCHED_ROUTE = "(unmatched)"
+
+
+def route_label(scope: Dict) -> str:
+    """
+    "METHOD /route/{param}" of the route that handled a request. Per-route
+    statistics are keyed by it, so the label never contains the raw path or
+    an arbitrary method, which would let scanners grow them without bound.
+    """
+    route = scope.get("route")
+    methods = getattr(route, "methods", None)
+    if route is None or (methods is not None and scope["method"] not in methods):
+        return UNMATCHED_ROUTE
+    return f"{scope['method']} {route.path_format}"
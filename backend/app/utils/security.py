@@ -1,7 +1,13 @@
+import base64
 import hashlib
+import hmac
+import os
 import secrets
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from cryptography.fernet import Fernet, InvalidToken
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -14,6 +20,56 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
 
+def hash_verifier(verifier: str, key: bytes) -> bytes:
+    """Keyed hash (HMAC-SHA256, 32 bytes) of a refresh token verifier"""
+    return hmac.new(key, verifier.encode(), hashlib.sha256).digest()
+
+
+def derive_encryption_key(secret: str, purpose: str) -> bytes:
+    """Fernet key derived from an application secret, separate per purpose"""
+    return base64.urlsafe_b64encode(hashlib.sha256(f"{purpose}:{secret}".encode()).digest())
+
+
+def encrypt_secret(value: str, key: bytes) -> str:
+    """Encrypt and authenticate a secret for storage"""
+    return Fernet(key).encrypt(value.encode()).decode()
+
+
+def decrypt_secret(encrypted: str, key: bytes) -> Optional[str]:
+    """Decrypt a stored secret, or None if it was tampered with or the key changed"""
+    try:
+        return Fernet(key).decrypt(encrypted.encode()).decode()
+    except InvalidToken:
+        return None
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7): Unix time in ms, then 74 random bits"""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp(value: uuid.UUID) -> Optional[float]:
+    """Creation time (Unix seconds) of a version 7 UUID, None for other versions"""
+    if value.version != 7:
+        return None
+    return (value.int >> 80) / 1000
+
+
+def split_selector_token(token: str) -> Optional[Tuple[uuid.UUID, str]]:
+    """Split a '<selector>.<verifier>' token into (row id, verifier)"""
+    selector, separator, verifier = token.partition(".")
+    if not separator or not verifier:
+        return None
+
+    try:
+        return uuid.UUID(hex=selector), verifier
+    except ValueError:
+        return None
+
+
 def generate_state_parameter() -> str:
     """Generate OAuth2 state parameter for CSRF protection"""
     return generate_secure_token(32)
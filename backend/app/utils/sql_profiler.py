@@ -0,0 +1,276 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.routes import route_label
+
+# Most statements each route may execute per request, as "METHOD /route".
+# Observed maxima from a replay of the production request mix; lower them
+# when a route gets cheaper, raise them only deliberately
+ROUTE_QUERY_BUDGETS: Dict[str, int] = {
+    "POST /api/v1/auth/login/{provider}": 0,
+    "GET /api/v1/auth/callback/{provider}": 6,
+    "POST /api/v1/auth/refresh": 7,
+    "POST /api/v1/auth/logout": 3,
+    "GET /api/v1/user/profile": 1,
+    "GET /api/v1/user/events": 2,
+    "POST /api/v1/link/start/{provider}": 1,
+    "GET /api/v1/link/callback/{provider}": 7,
+    "DELETE /api/v1/link/{provider}": 8,
+}
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LISTS = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:, \1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+_active_logs: ContextVar[Tuple["QueryLog", ...]] = ContextVar("sql_query_logs", default=())
+# Scope of the request being profiled; routing adds the matched route to it
+_request_scope: ContextVar[Optional[Dict]] = ContextVar("sql_profiler_scope", default=None)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """SQL with literals and bind parameters as ?, IN lists and VALUES batches collapsed"""
+    normalized = _WHITESPACE.sub(" ", _COMMENTS.sub(" ", statement)).strip()
+    normalized = _PLACEHOLDERS.sub("?", _LITERALS.sub("?", normalized))
+    normalized = _IN_LISTS.sub("IN (...)", normalized)
+    return _VALUES_ROWS.sub(r"\1, ...", normalized)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block or route executes more SQL statements than its budget"""
+
+
+class QueryLog:
+    """Statements executed while the log was active: count, time and fingerprints in order"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: List[str] = []
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Fingerprints executed at least threshold times (N+1 candidates)"""
+        counts: Dict[str, int] = {}
+        for statement in self.fingerprints:
+            counts[statement] = counts.get(statement, 0) + 1
+        return {statement: count for statement, count in counts.items() if count >= threshold}
+
+    def describe(self) -> str:
+        return "\n".join(f"  {n}. {statement}" for n, statement in enumerate(self.fingerprints, 1))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._sql_fingerprint = fingerprint(statement)
+    context._sql_started = time.perf_counter()
+    for log in _active_logs.get():
+        log.count += 1
+        log.fingerprints.append(context._sql_fingerprint)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._sql_started
+    for log in _active_logs.get():
+        log.seconds += elapsed
+    if elapsed * 1000 >= sql_profiler.slow_query_ms:
+        sql_profiler.record_slow(context._sql_fingerprint, elapsed)
+
+
+def install_listeners() -> None:
+    """Register the statement listeners on every engine (idempotent)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """
+    Record the statements executed in this context (and threadpool work
+    started from it) into a QueryLog. Nests: every active log sees them.
+    """
+    install_listeners()
+    log = QueryLog()
+    token = _active_logs.set(_active_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_statements: int, allow_repeats: bool = False, label: str = "Block") -> Iterator[QueryLog]:
+    """
+    Test helper: fail if the block executes more than max_statements, or
+    repeats a statement fingerprint N+1-style unless allow_repeats.
+
+        with assert_query_budget(1):
+            user_service.get_principal(user_id, db)
+    """
+    with track_queries() as log:
+        yield log
+    if log.count > max_statements:
+        raise QueryBudgetExceeded(
+            f"{label} executed {log.count} SQL statements, budget {max_statements}:\n{log.describe()}"
+        )
+    repeated = {} if allow_repeats else log.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+    if repeated:
+        raise QueryBudgetExceeded(
+            f"{label} repeated statements (N+1): "
+            + "; ".join(f"{count}x {statement}" for statement, count in repeated.items())
+            + f"\n{log.describe()}"
+        )
+
+
+def assert_route_budget(route: str, allow_repeats: bool = False):
+    """
+    Test helper: assert_query_budget with the ROUTE_QUERY_BUDGETS entry of
+    route ("METHOD /route/{param}").
+
+        with assert_route_budget("GET /api/v1/user/profile"):
+            client.get("/api/v1/user/profile", headers=headers)
+    """
+    return assert_query_budget(ROUTE_QUERY_BUDGETS[route], allow_repeats, label=route)
+
+
+class SqlProfiler:
+    """
+    Per-route SQL statement counts and database time, the slow-query log and
+    N+1 detection.
+
+    Statements are normalized into fingerprints. A request that executes the
+    same fingerprint n_plus_one_threshold times or more is recorded as an N+1
+    suspect; a statement slower than slow_query_ms is logged with the route
+    that ran it. Routes exceeding their ROUTE_QUERY_BUDGETS entry are counted,
+    and raise QueryBudgetExceeded in strict mode.
+    """
+
+    def __init__(self, slow_query_ms: float, n_plus_one_threshold: int, strict: bool):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.strict = strict
+        self.recent_n_plus_one: deque = deque(maxlen=20)
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._slow: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record_slow(self, statement: str, elapsed: float) -> None:
+        """Add a statement to the slow-query log"""
+        scope = _request_scope.get()
+        route = route_label(scope) if scope is not None else "(no request)"
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            entry = self._slow.setdefault(statement, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()})
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["routes"].add(route)
+        metrics.increment("sql.slow_queries")
+        print(f"Slow query ({elapsed_ms:.0f} ms) in {route}: {statement}")
+
+    def observe(self, route: str, log: QueryLog) -> Optional[str]:
+        """Account a handled request; returns why it broke its budget, if it did"""
+        repeated = log.repeated(self.n_plus_one_threshold)
+        budget = ROUTE_QUERY_BUDGETS.get(route)
+        over_budget = budget is not None and log.count > budget
+
+        with self._lock:
+            totals = self._routes.setdefault(route, {
+                "requests": 0, "statements": 0, "max_statements": 0, "db_ms": 0.0,
+                "n_plus_one": 0, "over_budget": 0
+            })
+            totals["requests"] += 1
+            totals["statements"] += log.count
+            totals["max_statements"] = max(totals["max_statements"], log.count)
+            totals["db_ms"] += log.seconds * 1000
+            totals["n_plus_one"] += bool(repeated)
+            totals["over_budget"] += over_budget
+            for statement, count in repeated.items():
+                self.recent_n_plus_one.append({"route": route, "count": count, "statement": statement})
+
+        metrics.increment("sql.statements", log.count)
+        metrics.increment("sql.db_ms", log.seconds * 1000)
+        if repeated:
+            metrics.increment("sql.n_plus_one")
+        if over_budget:
+            metrics.increment("sql.budget_exceeded")
+            return f"{route} executed {log.count} SQL statements, budget {budget}:\n{log.describe()}"
+        return None
+
+    def report(self) -> Dict:
+        """Statements and database time per route, N+1 suspects and the slow-query log"""
+        with self._lock:
+            routes = {}
+            for route, totals in self._routes.items():
+                requests = totals["requests"]
+                routes[route] = {
+                    "requests": requests,
+                    "mean_statements": round(totals["statements"] / requests, 2),
+                    "max_statements": totals["max_statements"],
+                    "budget": ROUTE_QUERY_BUDGETS.get(route),
+                    "mean_db_ms": round(totals["db_ms"] / requests, 3),
+                    "n_plus_one": totals["n_plus_one"],
+                    "over_budget": totals["over_budget"]
+                }
+            slow = [
+                {
+                    "statement": statement,
+                    "count": entry["count"],
+                    "total_ms": round(entry["total_ms"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "routes": sorted(entry["routes"])
+                }
+                for statement, entry in sorted(self._slow.items(), key=lambda item: -item[1]["total_ms"])
+            ]
+            recent = list(reversed(self.recent_n_plus_one))
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "strict": self.strict,
+            "routes": routes,
+            "n_plus_one": recent,
+            "slow_queries": slow
+        }
+
+
+class SqlProfilerMiddleware:
+    """ASGI middleware tracking the SQL statements each request executes"""
+
+    def __init__(self, app, profiler: SqlProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(scope)
+        try:
+            with track_queries() as log:
+                await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+        violation = self.profiler.observe(route_label(scope), log)
+        if violation is not None and self.profiler.strict:
+            raise QueryBudgetExceeded(violation)
+
+
+# Global SQL profiler (listeners are installed when SQL_PROFILER is on)
+sql_profiler = SqlProfiler(
+    slow_query_ms=settings.SQL_SLOW_QUERY_MS,
+    n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    strict=settings.SQL_STRICT
+)
@@ -0,0 +1,48 @@
+"""
+Per-request cost of pool_pre_ping.
+
+Each "request" checks a connection out of the pool, runs one trivial query
+and returns it, the way get_db() sessions do. With pre-ping, every checkout
+first sends its own ping to the server, so the difference between the two
+runs is one network round trip to the database (or pooler) per request.
+
+Run from the backend directory against the database to measure (defaults to
+DATABASE_URL):
+
+    python -m benchmarks.bench_pool_checkout [postgresql://...]
+"""
+import sys
+import time
+from sqlalchemy import create_engine, text
+from app.config import settings
+
+ITERATIONS = 2000
+
+
+def _per_request_us(url: str, pre_ping: bool) -> float:
+    engine = create_engine(url, pool_pre_ping=pre_ping, pool_size=1, max_overflow=0)
+    try:
+        # Open the pooled connection outside the timed loop
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        return (time.perf_counter() - start) / ITERATIONS * 1_000_000
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else settings.DATABASE_URL
+    with_ping = _per_request_us(url, pre_ping=True)
+    without_ping = _per_request_us(url, pre_ping=False)
+    print(f"  pre-ping     {with_ping:10.1f} us/request")
+    print(f"  no pre-ping  {without_ping:10.1f} us/request")
+    print(f"  saved        {with_ping - without_ping:10.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-request cost of resolving the authenticated user, ORM entity vs Principal.
+
+"entity" is what the auth dependencies used to do: load the full User through
+the session (identity map, instance state, relationship loaders) and read a
+few attributes off it. "principal" is UserService.get_principal: one Core
+select of id, email and profile_version returned as a Principal tuple. Each
+call uses a fresh session, like a request. Memory is the peak traced by
+tracemalloc during one call, i.e. the transient allocations per request.
+
+Runs on in-memory SQLite, so it measures Python/SQLAlchemy overhead only. Run
+from the backend directory (needs the usual settings in the environment;
+DATABASE_URL is overridden):
+
+    python -m benchmarks.bench_principal
+"""
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import time
+import tracemalloc
+from app.database import SessionLocal, create_sqlite_schema
+from app.services.user_service import UserService
+
+ITERATIONS = 5000
+MEMORY_SAMPLES = 200
+
+user_service = UserService()
+
+
+def _entity(user_id: str) -> None:
+    db = SessionLocal()
+    try:
+        user = user_service.get_user_by_id(user_id, db)
+        {"user_id": str(user.id), "email": user.email, "profile_version": user.profile_version}
+    finally:
+        db.close()
+
+
+def _principal(user_id: str) -> None:
+    db = SessionLocal()
+    try:
+        user_service.get_principal(user_id, db)
+    finally:
+        db.close()
+
+
+def _per_call_us(fn, user_id: str) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(user_id)
+    return (time.perf_counter() - start) / ITERATIONS * 1_000_000
+
+
+def _peak_kib(fn, user_id: str) -> float:
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(MEMORY_SAMPLES):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            fn(user_id)
+            total += tracemalloc.get_traced_memory()[1] - baseline
+        return total / MEMORY_SAMPLES / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    create_sqlite_schema()
+    db = SessionLocal()
+    user_id = str(user_service.create_user("bench@example.com", "cognito", "bench", True, db).id)
+    db.close()
+
+    # Warm statement caches
+    _entity(user_id)
+    _principal(user_id)
+
+    print(f"{'lookup':<10} {'us/call':>10} {'peak KiB':>10}")
+    for name, fn in (("entity", _entity), ("principal", _principal)):
+        print(f"{name:<10} {_per_call_us(fn, user_id):>10.1f} {_peak_kib(fn, user_id):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
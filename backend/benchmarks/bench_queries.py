@@ -0,0 +1,113 @@
+"""
+CPU per service call before and after the hot-path statements were prebuilt.
+
+"after" calls the services as they are. "before" calls the same service
+methods with only their lookup swapped back to the per-call
+``db.query(...).filter(...)`` form they used before, which rebuilds the
+statement and regenerates its cache key on every call. Both run against one
+in-memory SQLite session, so the difference is Python and SQLAlchemy CPU
+rather than database time; SQLite's own execution is included in both
+columns and cancels out of "saved".
+
+Run from the backend directory (needs the usual settings in the environment;
+DATABASE_URL is overridden):
+
+    python -m benchmarks.bench_queries
+"""
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import hmac
+import time
+import uuid
+from typing import Optional
+from sqlalchemy.orm import Session, selectinload
+from app.database import SessionLocal, create_sqlite_schema
+from app.models.linked_identity import LinkedIdentity
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.services.jwt_service import JWTService
+from app.services.link_service import LinkService
+from app.services.user_service import UserService
+from app.utils.security import hash_verifier, split_selector_token
+
+ITERATIONS = 5000
+
+
+class LegacyUserService(UserService):
+    """Lookups built per call, as before the statements were prebuilt"""
+
+    def get_user_by_id(self, user_id: str, db: Session, load_identities: bool = False, use_replica: bool = True):
+        query = db.query(User)
+        if load_identities:
+            query = query.options(selectinload(User.linked_identities))
+        return query.filter(User.id == uuid.UUID(user_id)).first()
+
+    def get_profile_state(self, user_id: str, db: Session):
+        return db.query(User.profile_version, User.profile_document).filter(
+            User.id == uuid.UUID(user_id)
+        ).first()
+
+
+class LegacyLinkService(LinkService):
+    def get_linked_identities(self, user_id: str, db: Session) -> list:
+        return db.query(LinkedIdentity).filter(
+            LinkedIdentity.user_id == uuid.UUID(user_id)
+        ).order_by(LinkedIdentity.linked_at).all()
+
+
+class LegacyJWTService(JWTService):
+    def _find_refresh_token(self, token: str, db: Session, live_only: bool) -> Optional[RefreshToken]:
+        # Selector tokens only; the benchmark issues no legacy ones
+        selector, verifier = split_selector_token(token)
+        query = db.query(RefreshToken).filter(RefreshToken.id == selector)
+        if live_only:
+            query = query.filter(RefreshToken.revoked == False)
+        refresh_token = query.first()
+        if not refresh_token or refresh_token.verifier_hash is None:
+            return None
+        if not hmac.compare_digest(bytes(refresh_token.verifier_hash), hash_verifier(verifier, self.verifier_key)):
+            return None
+        return refresh_token
+
+
+def _cpu_us_per_call(operation) -> float:
+    operation()  # compile and cache outside the timing
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        operation()
+    return (time.process_time() - start) / ITERATIONS * 1_000_000
+
+
+def main() -> None:
+    create_sqlite_schema()
+    db = SessionLocal()
+
+    user_service, legacy_user_service = UserService(), LegacyUserService()
+    link_service, legacy_link_service = LinkService(), LegacyLinkService()
+    jwt_service, legacy_jwt_service = JWTService(), LegacyJWTService()
+
+    user = user_service.create_user("bench@example.com", "cognito", "sub-bench", True, db)
+    user_id = str(user.id)
+    link_service.link_identity(user_id, "auth0", "auth0|bench", "bench@example.com", db)
+    token = jwt_service.create_refresh_token(user_id, db)
+
+    cases = [
+        ("get_user_by_id", lambda service: service.get_user_by_id(user_id, db), user_service, legacy_user_service),
+        ("get_profile_state", lambda service: service.get_profile_state(user_id, db), user_service, legacy_user_service),
+        ("get_linked_identities", lambda service: service.get_linked_identities(user_id, db), link_service, legacy_link_service),
+        ("verify_refresh_token", lambda service: service.verify_refresh_token(token, db), jwt_service, legacy_jwt_service),
+    ]
+
+    print(f"{'service call':<24} {'before':>10} {'after':>10} {'saved':>10}  (CPU us/call)")
+    for name, call, service, legacy_service in cases:
+        before = _cpu_us_per_call(lambda: call(legacy_service))
+        after = _cpu_us_per_call(lambda: call(service))
+        print(f"{name:<24} {before:>10.1f} {after:>10.1f} {before - after:>10.1f}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Service-layer throughput on in-memory SQLite.
+
+Runs the hot service paths (signup, login, profile read, refresh token
+issue/verify/rotate, rejection of an unknown refresh token, link) end to end through the ORM against an in-memory
+SQLite database, so the numbers cover Python and SQLAlchemy overhead without a
+database server or network. Use it to compare changes to the services, not
+as a prediction of Postgres latency.
+
+Run from the backend directory (needs the usual settings in the environment;
+DATABASE_URL is overridden):
+
+    python -m benchmarks.bench_services
+"""
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import itertools
+import time
+import uuid
+from app.database import SessionLocal, create_sqlite_schema
+from app.services.jwt_service import JWTService
+from app.services.link_service import LinkService
+from app.services.token_filter import refresh_token_filter
+from app.services.user_service import UserService
+
+ITERATIONS = 2000
+
+user_service = UserService()
+jwt_service = JWTService()
+link_service = LinkService()
+_counter = itertools.count()
+
+
+def _signup(db) -> str:
+    n = next(_counter)
+    user = user_service.create_user(f"user{n}@example.com", "cognito", f"sub-{n}", True, db)
+    return str(user.id)
+
+
+def _per_second(operation) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            operation(db)
+        return ITERATIONS / (time.perf_counter() - start)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    create_sqlite_schema()
+
+    db = SessionLocal()
+    user_id = _signup(db)
+    token = jwt_service.create_refresh_token(user_id, db)
+    refresh_token_filter.rebuild(db)
+    db.close()
+    unknown = f"{uuid.uuid4().hex}.{token.split('.', 1)[1]}"
+
+    def login(db):
+        user = user_service.get_user_by_identity("cognito", "sub-0", db)
+        user_service.update_last_login(user_id, db, user=user)
+
+    def profile(db):
+        user_service.get_user_profile(user_id, db)
+
+    def verify(db):
+        jwt_service.verify_refresh_token(token, db)
+
+    def reject_unknown(db):
+        jwt_service.verify_refresh_token(unknown, db)
+
+    def issue_and_rotate(db):
+        jwt_service.rotate_refresh_token(jwt_service.create_refresh_token(user_id, db), user_id, db)
+
+    def link(db):
+        n = next(_counter)
+        user = user_service.create_user(f"user{n}@example.com", "cognito", f"sub-{n}", True, db)
+        link_service.link_identity(str(user.id), "auth0", f"link-{n}", user.email, db)
+
+    cases = [
+        ("signup", _signup),
+        ("login", login),
+        ("profile", profile),
+        ("verify refresh", verify),
+        ("reject unknown", reject_unknown),
+        ("issue + rotate", issue_and_rotate),
+        ("signup + link", link),
+    ]
+
+    print(f"{'operation':<16} {'ops/s':>10} {'us/op':>10}")
+    for name, operation in cases:
+        rate = _per_second(operation)
+        print(f"{name:<16} {rate:>10.0f} {1_000_000 / rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()